@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core.transaction import DayParser, transaction_from_dict
+from spendwise.core.json_stream import JsonArrayReader
+
+CATEGORIES = ["category_food", "category_transport", "category_housing", "category_salary", "category_other_expense"]
+
+
+def write_ledger(path, rows):
+    # About ten years of history, so many rows share a date like real ledgers do.
+    rng = random.Random(0)
+    first = QDate(2015, 1, 1)
+    dates = [first.addDays(i).toString("yyyy-MM-dd") for i in range(3650)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"journal_seq": 0, "transactions": [\n')
+        for i in range(rows):
+            record = {
+                "id": f"tx-{i}",
+                "date": rng.choice(dates),
+                "description": f"Transaction {i}",
+                "type": rng.choice(("income", "expense")),
+                "amount": round(rng.uniform(1, 500), 2),
+                "category": rng.choice(CATEGORIES),
+            }
+            f.write(("" if i == 0 else ",\n") + json.dumps(record))
+        f.write("\n]}\n")
+
+
+def time_parse(records, day_parser):
+    started = time.perf_counter()
+    parsed = 0
+    for t_data in records:
+        if transaction_from_dict(t_data, day_parser) is not None:
+            parsed += 1
+    return time.perf_counter() - started, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row Qt date parsing with the memoized bulk path.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "spendwise_data.json")
+        write_ledger(path, args.rows)
+        records = list(JsonArrayReader(path, "transactions"))
+
+    qt_seconds, qt_rows = time_parse(records, None)
+    bulk_seconds, bulk_rows = time_parse(records, DayParser())
+    assert qt_rows == bulk_rows == args.rows
+
+    print(f"{args.rows} rows")
+    print(f"Qt date parse per row:    {qt_seconds:.2f}s ({args.rows / qt_seconds:,.0f} rows/s)")
+    print(f"DayParser (memoized):     {bulk_seconds:.2f}s ({args.rows / bulk_seconds:,.0f} rows/s)")
+    print(f"Speedup: {qt_seconds / bulk_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core.backends.file_backend import FileBackend
+from spendwise.core.importers import ImportMapping, iter_statement_transactions
+
+
+def write_statements(tmp_dir, rows, files):
+    # One CSV per month, signed amounts, dd/MM/yyyy dates like most bank exports.
+    rng = random.Random(0)
+    first = QDate(2024, 1, 1)
+    paths = []
+    for month in range(files):
+        path = os.path.join(tmp_dir, f"statement_{month + 1:02d}.csv")
+        start = first.addMonths(month)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Description", "Amount"])
+            for i in range(rows // files):
+                day = start.addDays(rng.randrange(start.daysInMonth()))
+                amount = round(rng.uniform(-300, 150), 2)
+                writer.writerow([day.toString("dd/MM/yyyy"), f"Card payment {month}-{i}", amount])
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a bulk import of a year of CSV statements.")
+    parser.add_argument("--rows", type=int, default=600000)
+    parser.add_argument("--files", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_statements(tmp_dir, args.rows, args.files)
+        data_dir = os.path.join(tmp_dir, "data")
+        os.makedirs(data_dir)
+        backend = FileBackend(data_dir)
+        backend.load()
+
+        started = time.perf_counter()
+        parsed = list(iter_statement_transactions(paths, ImportMapping(date_formats=("dd/MM/yyyy",))))
+        parse_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        backend.add_many(parsed)
+        add_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        backend.close()
+        close_seconds = time.perf_counter() - started
+
+    total = parse_seconds + add_seconds + close_seconds
+    print(f"{len(parsed)} rows in {args.files} files")
+    print(f"parse (process pool): {parse_seconds:.2f}s")
+    print(f"add_many:             {add_seconds:.2f}s")
+    print(f"persist on close:     {close_seconds:.2f}s")
+    print(f"total:                {total:.2f}s ({len(parsed) / total:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
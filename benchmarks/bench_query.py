@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core.query import Query
+from spendwise.core.store import TransactionStore, TransactionView
+
+CATEGORIES = ["category_food", "category_transport", "category_housing", "category_salary", "category_other_expense"]
+
+
+def build_store(rows):
+    rng = np.random.default_rng(0)
+    first = QDate.currentDate().toJulianDay() - 3650
+    store = TransactionStore()
+    store.extend_columns(
+        [f"tx-{i}" for i in range(rows)],
+        rng.integers(first, first + 3650, rows),
+        [f"Transaction {i} {CATEGORIES[i % len(CATEGORIES)][9:]}" for i in range(rows)],
+        rng.integers(0, 2, rows),
+        np.round(rng.uniform(1, 500, rows), 2),
+        np.array([store.categories.code(category) for category in CATEGORIES])[rng.integers(0, len(CATEGORIES), rows)],
+    )
+    return store
+
+
+def naive(store, query):
+    # What the widgets used to do: materialize every row, then filter and sum in Python.
+    start_day, end_day = query.start_day(), query.end_day()
+    totals = {}
+    for t in TransactionView(store, store.all_rows()):
+        if (start_day is not None and t.day < start_day) or (end_day is not None and t.day > end_day):
+            continue
+        if query.types is not None and t.type not in query.types:
+            continue
+        if query.categories is not None and t.category not in query.categories:
+            continue
+        if query.min_amount is not None and t.amount < query.min_amount:
+            continue
+        if query.text and query.text not in t.description.casefold():
+            continue
+        totals[t.category] = totals.get(t.category, 0.0) + t.amount
+    return totals
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query engine against a materialize-and-filter loop.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    store = build_store(args.rows)
+    today = QDate.currentDate()
+    queries = {
+        "expenses by category, last year": Query().between(today.addYears(-1), today).of_type("expense"),
+        "two categories, 3 years, amount >= 100": Query().between(today.addYears(-3), today)
+        .in_categories("category_food", "category_housing").amount_between(100),
+        "description contains 'food 12'": Query().matching("food 12"),
+    }
+    print(f"{args.rows} rows")
+    for label, query in queries.items():
+        grouped, engine_seconds = timed(store.query_groups, query.group_by("category"))
+        expected, naive_seconds = timed(naive, store, query)
+        assert set(grouped) == set(expected)
+        assert all(abs(grouped[key][0] - expected[key]) < 1e-3 for key in expected)
+        print(f"{label:40s} engine {engine_seconds * 1000:8.1f} ms   naive {naive_seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
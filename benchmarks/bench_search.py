@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from spendwise.core.query import Query
+from spendwise.core.store import TransactionView
+from bench_query import build_store
+
+
+def scan(store, text):
+    # What matching_rows did before the word index: casefold every description.
+    return [t.id for t in TransactionView(store, store.all_rows()) if text in t.description.casefold()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Description search through the word index against a plain scan.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--text", default="transaction 12345 food")
+    args = parser.parse_args()
+
+    store = build_store(args.rows)
+    started = time.perf_counter()
+    store.matching_rows(Query().matching("x"))
+    print(f"{args.rows} rows, index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # One query per keystroke, as the search box sends them.
+    text = args.text.casefold()
+    typed = 0.0
+    for length in range(1, len(text) + 1):
+        started = time.perf_counter()
+        rows = store.matching_rows(Query().matching(text[:length]))
+        typed += time.perf_counter() - started
+    started = time.perf_counter()
+    expected = scan(store, text)
+    scanned = time.perf_counter() - started
+    assert sorted(t.id for t in TransactionView(store, rows)) == sorted(expected)
+    print(f"typing {len(text)} keystrokes: {typed * 1000:8.1f} ms total   one scan: {scanned * 1000:8.1f} ms")
+    for word in ("food", "12345", "ransac"):
+        started = time.perf_counter()
+        found = len(store.matching_rows(Query().matching(word)))
+        print(f"'{word}' ({found} rows): {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
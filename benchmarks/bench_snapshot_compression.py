@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core.backends.file_backend import FileBackend
+from spendwise.core.query import Query
+from spendwise.core.store import TransactionStore
+from spendwise.core.transaction import Transaction
+
+CATEGORIES = ["category_food", "category_transport", "category_housing", "category_salary", "category_other_expense"]
+MERCHANTS = [f"{kind} {i}" for kind in ("Grocery store", "Coffee shop", "Fuel station", "Pharmacy", "Restaurant")
+             for i in range(40)]
+
+
+def build_store(rows):
+    # Descriptions repeat like real statements do: a few hundred merchants.
+    rng = np.random.default_rng(0)
+    first = QDate.currentDate().toJulianDay() - 3650
+    days = rng.integers(first, first + 3650, rows).tolist()
+    amounts = np.round(rng.uniform(1, 500, rows), 2).tolist()
+    types = rng.integers(0, 2, rows).tolist()
+    categories = rng.integers(0, len(CATEGORIES), rows).tolist()
+    merchants = rng.integers(0, len(MERCHANTS), rows).tolist()
+    store = TransactionStore()
+    store.extend(
+        Transaction(f"tx-{i}", QDate.fromJulianDay(days[i]), MERCHANTS[merchants[i]],
+                    ("income", "expense")[types[i]], amounts[i], CATEGORIES[categories[i]])
+        for i in range(rows)
+    )
+    return store
+
+
+def balance(type_totals):
+    return type_totals.get("income", (0.0, 0))[0] - type_totals.get("expense", (0.0, 0))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare indent=4 JSON snapshots with chunked compressed ones.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    store = build_store(args.rows)
+    expected_balance = balance(store.query_groups(Query().group_by("type")))
+    print(f"{args.rows} rows")
+    for label, snapshot_format, compression in (
+        ("json (indent=4)", "json", "zlib"), ("compressed, zlib", "compressed", "zlib"),
+        ("compressed, lzma", "compressed", "lzma"),
+    ):
+        with tempfile.TemporaryDirectory() as data_dir:
+            backend = FileBackend(data_dir, snapshot_format=snapshot_format, compression=compression)
+            started = time.perf_counter()
+            backend._write_snapshot(store, 0)
+            saved = time.perf_counter() - started
+            size = os.path.getsize(backend._snapshot_paths()[snapshot_format])
+
+            backend = FileBackend(data_dir, snapshot_format=snapshot_format, compression=compression)
+            started = time.perf_counter()
+            backend.load()
+            loaded = time.perf_counter() - started
+            assert len(backend.execute(Query())) == args.rows
+            assert abs(balance(backend.execute(Query().group_by("type"))) - expected_balance) < 1e-3
+            backend.close()
+        print(f"{label:>18}: {size / 1e6:8.1f} MB, save {saved:6.2f}s, load {loaded:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
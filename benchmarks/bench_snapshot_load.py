@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core.backends.file_backend import FileBackend
+from spendwise.core.query import Query
+from spendwise.core.store import TransactionStore
+from spendwise.core.transaction import Transaction
+
+CATEGORIES = ["category_food", "category_transport", "category_housing", "category_salary", "category_other_expense"]
+
+
+def build_store(rows):
+    rng = np.random.default_rng(0)
+    first = QDate.currentDate().toJulianDay() - 3650
+    days = rng.integers(first, first + 3650, rows).tolist()
+    amounts = np.round(rng.uniform(1, 500, rows), 2).tolist()
+    types = rng.integers(0, 2, rows).tolist()
+    categories = rng.integers(0, len(CATEGORIES), rows).tolist()
+    store = TransactionStore()
+    store.extend(
+        Transaction(f"tx-{i}", QDate.fromJulianDay(days[i]), f"Transaction {i}",
+                    ("income", "expense")[types[i]], amounts[i], CATEGORIES[categories[i]])
+        for i in range(rows)
+    )
+    return store
+
+
+def time_load(data_dir, snapshot_format, window_days=0):
+    backend = FileBackend(data_dir, snapshot_format=snapshot_format, window_days=window_days)
+    started = time.perf_counter()
+    backend.load()
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    backend.execute(Query().group_by("type"))
+    today = QDate.currentDate()
+    backend.execute(
+        Query().between(today.addYears(-7).addDays(13), today.addYears(-2).addDays(-40)).of_type("expense").group_by("category")
+    )
+    len(backend.execute(Query().between(today.addMonths(-1), today)))
+    queried = time.perf_counter() - started
+    backend.close()
+    return loaded, queried
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and memory-mapped binary snapshot startup.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    store = build_store(args.rows)
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(f"{args.rows} rows")
+        for label, snapshot_format, window_days in (
+            ("json", "json", 0), ("json, 31-day window", "json", 31), ("binary", "binary", 0)
+        ):
+            FileBackend(data_dir, snapshot_format=snapshot_format)._write_snapshot(store, 0)
+            loaded, queried = time_load(data_dir, snapshot_format, window_days)
+            print(f"{label:>20}: load {loaded * 1000:9.1f} ms, first balance/range queries {queried * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
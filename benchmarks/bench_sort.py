@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from spendwise.core.query import Query, ORDER_FIELDS
+from spendwise.core.store import TransactionView
+from bench_query import build_store
+
+PAGE_ROWS = 256
+
+
+def naive(view, field, descending):
+    # A comparison sort over materialized rows, roughly what the table's
+    # proxy model did (it also formatted every value it compared).
+    key = {
+        "date": lambda t: t.day, "description": lambda t: t.description.casefold(), "type": lambda t: t.type,
+        "amount": lambda t: t.amount, "category": lambda t: t.category,
+    }[field]
+    return sorted(range(len(view)), key=lambda i: key(view[i]), reverse=descending)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-ordered table pages against a comparison sort over rows.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--naive-rows", type=int, default=100000,
+                        help="rows for the (much slower) comparison sort")
+    args = parser.parse_args()
+
+    store = build_store(args.rows)
+    small_rows = store.all_rows()[:args.naive_rows]
+    print(f"{args.rows} rows (comparison sort: {len(small_rows)} rows), pages of {PAGE_ROWS}")
+    for field in ORDER_FIELDS:
+        for descending in (False, True):
+            query = Query().order_by(field, descending)
+            _, first_seconds = timed(store.query_rows, query.limit(PAGE_ROWS))
+            # Later pages reuse the ordered rows of the first.
+            page, next_seconds = timed(store.query_rows, query.limit(PAGE_ROWS, PAGE_ROWS))
+            assert len(page) == min(PAGE_ROWS, max(args.rows - PAGE_ROWS, 0))
+            # A fresh view each time, so no rows come ready-made from its cache.
+            _, naive_seconds = timed(naive, TransactionView(store, small_rows), field, descending)
+            label = f"{field} {'desc' if descending else 'asc'}"
+            print(f"{label:18s} first page {first_seconds * 1000:8.1f} ms   next page {next_seconds * 1000:6.2f} ms"
+                  f"   comparison sort {naive_seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QDate
+from spendwise.core import suggestions
+from spendwise.core.suggestions import DescriptionSuggester, recency_weight
+
+MERCHANTS = ["Coffee", "Grocery", "Fuel", "Pharmacy", "Bakery", "Taxi", "Cinema", "Bookshop", "Market", "Restaurant"]
+CATEGORIES = ["category_food", "category_transport", "category_healthcare", "category_entertainment", "category_shopping"]
+
+
+def build_records(rows, distinct):
+    rng = random.Random(0)
+    descriptions = [f"{rng.choice(MERCHANTS)} {rng.choice('ABCDEFGH')}{i} {rng.randrange(100)}" for i in range(distinct)]
+    first = QDate.currentDate().toJulianDay() - 3650
+    return [
+        (descriptions[min(int(rng.paretovariate(1.2)) - 1, distinct - 1) if i >= distinct else i],
+         first + rng.randrange(3650), "expense", rng.choice(CATEGORIES), round(rng.uniform(1, 200), 2))
+        for i in range(rows)
+    ]
+
+
+def check_rankings(rounds):
+    # Small add_many() batches (the path imports take), single adds and
+    # removals, with every prefix's suggestions compared against ranking all
+    # of its descriptions from scratch. A tiny SCAN_LIMIT makes even short
+    # prefixes keep cached lists.
+    rng = random.Random(2)
+    scan_limit, suggestions.SCAN_LIMIT = suggestions.SCAN_LIMIT, 4
+    try:
+        suggester = DescriptionSuggester(limit=3)
+        scores = {}
+        uses = {}
+        added = []
+        first = QDate.currentDate().toJulianDay() - 700
+        for _ in range(rounds):
+            if added and rng.random() < 0.1:
+                record = added.pop(rng.randrange(len(added)))
+                suggester.remove(*record)
+                key = record[0].casefold()
+                scores[key] -= recency_weight(record[1])
+                uses[key] -= 1
+                if not uses[key]:
+                    del scores[key], uses[key]
+                batch = []
+            else:
+                batch = [
+                    ("".join(rng.choice("abc") for _ in range(rng.randrange(1, 5))), first + rng.randrange(700),
+                     "expense", "category_food", 1.0)
+                    for _ in range(rng.randrange(1, 16))
+                ]
+                suggester.add_many(batch)
+            for record in batch:
+                added.append(record)
+                scores[record[0]] = scores.get(record[0], 0.0) + recency_weight(record[1])
+                uses[record[0]] = uses.get(record[0], 0) + 1
+            for prefix in {key[:end] for key in scores for end in range(1, len(key) + 1)}:
+                got = [scores[text.casefold()] for text in suggester.suggest(prefix)]
+                expected = sorted((score for key, score in scores.items() if key.startswith(prefix)), reverse=True)[:3]
+                assert len(got) == len(expected) and all(abs(a - b) <= 1e-9 * max(a, 1.0) for a, b in zip(got, expected)), \
+                    (prefix, suggester.suggest(prefix), got, expected)
+    finally:
+        suggestions.SCAN_LIMIT = scan_limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Description autocomplete build, lookup and update times.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--distinct", type=int, default=300000)
+    parser.add_argument("--check-rounds", type=int, default=300,
+                        help="rounds of the ranking check against a brute-force oracle (0 skips it)")
+    args = parser.parse_args()
+
+    if args.check_rounds:
+        started = time.perf_counter()
+        check_rankings(args.check_rounds)
+        print(f"rankings match a brute-force oracle over {args.check_rounds} rounds ({time.perf_counter() - started:.1f} s)")
+
+    records = build_records(args.rows, args.distinct)
+    started = time.perf_counter()
+    suggester = DescriptionSuggester()
+    suggester.add_many(records)
+    print(f"{args.rows} rows, {len(suggester)} distinct descriptions, built in {time.perf_counter() - started:.2f} s")
+
+    # Type a few hundred descriptions one keystroke at a time.
+    rng = random.Random(1)
+    timings = []
+    for description, *_ in rng.sample(records, 300):
+        for length in range(1, len(description) + 1):
+            started = time.perf_counter()
+            suggester.suggest(description[:length])
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"lookup over {len(timings)} keystrokes: median {timings[len(timings) // 2] * 1e6:.0f} us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us, max {timings[-1] * 1e6:.0f} us")
+
+    today = QDate.currentDate().toJulianDay()
+    started = time.perf_counter()
+    for description, _, type_key, category_key, amount in rng.sample(records, 1000):
+        suggester.add(description, today, type_key, category_key, amount)
+        suggester.remove(description, today, type_key, category_key, amount)
+    print(f"add + remove: {(time.perf_counter() - started) / 1000 * 1e6:.0f} us each")
+
+
+if __name__ == "__main__":
+    main()
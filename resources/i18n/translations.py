@@ -37,6 +37,18 @@ TRANSLATIONS = {
         "currency_select_prompt": "Select currency or define custom:", "currency_default_option": "Default (from language)",
         "currency_custom_option": "Custom...", "custom_currency_title": "Custom Currency Symbol",
         "custom_currency_prompt": "Enter currency symbol (e.g., CAD):", "currency_updated_status": "Currency settings updated.",
+        "loading_data_status": "Loading data...",
+        "import_statements": "&Import Statements...", "import_statements_title": "Import Bank Statements",
+        "import_file_filter": "Bank statements (*.csv *.ofx *.qfx);;All files (*)",
+        "import_done_status": "Imported {count} transactions.", "import_failed": "Could not import the selected files:\n{error}",
+        "export_transactions": "&Export Transactions...", "export_transactions_title": "Export Transactions",
+        "export_file_filter": "CSV (*.csv);;JSON Lines (*.jsonl);;SpendWise columnar (*.swcol)",
+        "export_done_status": "Exported {count} transactions in {seconds:.1f}s ({rate:,.0f} rows/s).",
+        "export_failed": "Could not export transactions:\n{error}",
+        "external_changes_status": "Applied {count} changes made outside SpendWise.",
+        "save_failed_title": "Changes Not Saved",
+        "save_failed_on_close": "Some recent changes could not be written to the data folder and are lost. Check that it is writable and has free space.",
+        "search_label": "Search:", "search_placeholder": "Description contains...",
     },
     "ar": {
         "app_title": "SpendWise - متتبع النفقات الحديث", "ok_button": "موافق", "cancel_button": "إلغاء",
@@ -75,5 +87,17 @@ TRANSLATIONS = {
         "currency_select_prompt": "اختر العملة أو أدخل رمزًا مخصصًا:", "currency_default_option": "افتراضي (حسب اللغة)",
         "currency_custom_option": "مخصص...", "custom_currency_title": "رمز عملة مخصص",
         "custom_currency_prompt": "أدخل رمز العملة (مثال: د.ك):", "currency_updated_status": "تم تحديث إعدادات العملة.",
+        "loading_data_status": "جارٍ تحميل البيانات...",
+        "import_statements": "&استيراد كشوف الحساب...", "import_statements_title": "استيراد كشوف الحساب البنكية",
+        "import_file_filter": "كشوف الحساب (*.csv *.ofx *.qfx);;كل الملفات (*)",
+        "import_done_status": "تم استيراد {count} معاملة.", "import_failed": "تعذّر استيراد الملفات المحددة:\n{error}",
+        "export_transactions": "ت&صدير المعاملات...", "export_transactions_title": "تصدير المعاملات",
+        "export_file_filter": "CSV (*.csv);;JSON Lines (*.jsonl);;ملف أعمدة SpendWise (*.swcol)",
+        "export_done_status": "تم تصدير {count} معاملة في {seconds:.1f} ث ({rate:,.0f} صف/ث).",
+        "export_failed": "تعذّر تصدير المعاملات:\n{error}",
+        "external_changes_status": "تم تطبيق {count} من التغييرات التي أُجريت خارج SpendWise.",
+        "save_failed_title": "لم تُحفظ التغييرات",
+        "save_failed_on_close": "تعذّرت كتابة بعض التغييرات الأخيرة في مجلد البيانات وقد فُقدت. تحقق من أنه قابل للكتابة وبه مساحة كافية.",
+        "search_label": "بحث:", "search_placeholder": "الوصف يحتوي على...",
     }
 }
@@ -0,0 +1,758 @@
+import functools
+import itertools
+import lzma
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+import numpy as np
+from PyQt5.QtCore import QDate
+from spendwise.core.transaction import (
+    TYPES, CATEGORIES, DayParser, transaction_from_dict, transaction_from_row, transaction_to_dict
+)
+from spendwise.core.journal import MutationJournal
+from spendwise.core.json_stream import JsonArrayReader, LoadCancelled
+from spendwise.core.binary_snapshot import BinarySnapshot, write_binary_snapshot
+from spendwise.core.compressed_snapshot import CompressedSnapshot, write_compressed_snapshot
+from spendwise.core.save_worker import SaveWorker
+from spendwise.core.changes import ChangeSet
+from spendwise.core.query import Query
+from spendwise.core.store import RecordView, TransactionStore, TransactionView
+from spendwise.core.exporters import EXPORT_CHUNK_ROWS
+from spendwise.core.shards import (
+    MANIFEST_VERSION, first_day_of_year, iter_shard_records, read_shards, remove_unreferenced_shards,
+    shard_file_name, year_of_day, years_of_days
+)
+
+# Once the journal grows past this many bytes it is folded into a new snapshot.
+JOURNAL_COMPACT_THRESHOLD = 512 * 1024
+# Snapshot records are turned into store rows this many at a time while loading.
+LOAD_CHUNK_ROWS = 20000
+
+SNAPSHOT_FORMATS = ("json", "binary", "sharded", "compressed")
+# When another writer changed more than this share of the ledger, the
+# reloaded store replaces ours instead of being applied row by row.
+EXTERNAL_SWAP_RATIO = 0.25
+
+# Keeps the whole ledger in memory, persisted as a snapshot plus an
+# append-only mutation journal. The snapshot is either JSON or the binary
+# format from binary_snapshot.py, which is memory-mapped on load instead of
+# being decoded record by record.
+#
+# With window_days set, a JSON snapshot is only read up to that many days
+# back at startup. JSON snapshots are written newest first with a per-day
+# totals table in front of the records, so the rest of the file can be left
+# unread: totals come from that table, and older rows are faulted in when a
+# query, id lookup or compaction needs them.
+#
+# The "sharded" format splits the snapshot into one JSON file per year plus a
+# manifest holding each shard's per-day totals. A compaction only rewrites
+# the years touched since the last one, shards are parsed in parallel, and
+# with window_days set, shards older than the window are not read at startup.
+#
+# The "compressed" format stores the rows in independently compressed chunks
+# (zlib or lzma, see compressed_snapshot.py) that are decoded in parallel.
+#
+# The files' stat signatures are recorded after each of our own writes, so a
+# mismatch means someone else (another instance, a sync client) changed them;
+# reload_external_changes() then diffs the files against the store by id.
+class FileBackend:
+    def __init__(self, data_dir, verify_totals=False, snapshot_format="json", window_days=0, compression="zlib"):
+        self.data_dir = data_dir
+        self.data_file = os.path.join(data_dir, "spendwise_data.json")
+        self.binary_file = os.path.join(data_dir, "spendwise_data.snap")
+        self.compressed_file = os.path.join(data_dir, "spendwise_data.swz")
+        self.shard_dir = os.path.join(data_dir, "spendwise_data.shards")
+        self.manifest_file = os.path.join(self.shard_dir, "manifest.json")
+        self.journal_file = os.path.join(data_dir, "spendwise_data.journal")
+
+        self.verify_totals = verify_totals
+        self.snapshot_format = snapshot_format
+        self.window_days = window_days
+        self.compression = compression
+        self._store = TransactionStore(verify_totals)
+        # Suspended snapshot reader while older rows are still unread, and the
+        # day from which on every snapshot row has been loaded.
+        self._history = None
+        self._loaded_from_day = None
+        # Ids added since the snapshot while its older rows were unread; their
+        # snapshot rows are stale and skipped when the history is read.
+        self._shadowed_ids = set()
+        # Manifest entries of the shards on disk by year (None unless the
+        # sharded format was loaded or written), and the years changed since.
+        self._shards = None
+        self._dirty_years = set()
+        self._journal = MutationJournal(self.journal_file)
+        self._lock = threading.RLock()
+        # Held around our own file writes and the signature taken after them.
+        self._io_lock = threading.Lock()
+        self._signature = None
+        self._worker = None
+        self.last_load_seconds = 0.0
+        # The snapshot the last load read (the journal if there was none).
+        self.source_file = None
+
+    def load(self, progress=None):
+        loaded_format = self._read_files(progress)
+        if self._worker is None:
+            self._worker = SaveWorker(self._append_journal, self._compact, self._needs_compaction)
+        with self._io_lock:
+            self._signature = self._file_signature()
+        if loaded_format is not None and loaded_format != self.snapshot_format:
+            self._worker.request_compaction()
+
+    def load_read_only(self, progress=None):
+        # Like load(), without a save worker: nothing is written, and a
+        # snapshot in another format is not converted. For copying the
+        # ledger to another backend; the mutating methods must not be used.
+        self._read_files(progress)
+
+    def _read_files(self, progress=None):
+        # Snapshot plus journal into a fresh store; returns the format read.
+        self._close_history()
+        self._store = TransactionStore(self.verify_totals)
+        self._shards = None
+        self._dirty_years = set()
+        snapshot_seq = 0
+        started = time.perf_counter()
+
+        # Prefer the configured format; another one is read when it is the
+        # only snapshot on disk, and the next compaction converts it.
+        available = [
+            snapshot_format for snapshot_format, path in self._snapshot_paths().items() if os.path.exists(path)
+        ]
+        loaded_format = self.snapshot_format if self.snapshot_format in available else next(iter(available), None)
+        if loaded_format == "binary":
+            snapshot_seq = self._load_binary(progress)
+        elif loaded_format == "sharded":
+            snapshot_seq = self._load_sharded(progress)
+        elif loaded_format == "compressed":
+            snapshot_seq = self._load_compressed(progress)
+        elif loaded_format == "json":
+            snapshot_seq = self._load_json(progress)
+
+        self._replay_journal(snapshot_seq)
+        self.last_load_seconds = time.perf_counter() - started
+        self.source_file = self._snapshot_paths()[loaded_format] if loaded_format is not None else self.journal_file
+        return loaded_format
+
+    def _load_json(self, progress):
+        try:
+            reader = JsonArrayReader(self.data_file, "transactions", progress=progress)
+            records = iter(reader)
+            day_parser = DayParser()
+            # The header keys written before the records are known once the
+            # first record has been read.
+            first = list(itertools.islice(records, 1))
+            stop_day = None
+            if self.window_days and reader.header.get("order") == "newest_first" and "day_totals" in reader.header:
+                stop_day = QDate.currentDate().toJulianDay() - self.window_days
+                self._store.load_day_totals(*self._parse_day_totals(reader.header["day_totals"], day_parser))
+
+            decode = functools.partial(transaction_from_dict, day_parser=day_parser)
+            exhausted, last_day = self._read_records(itertools.chain(first, records), decode, stop_day)
+            if exhausted:
+                records.close()
+                self._store.rebuild_indexes()
+            else:
+                self._history = (records, decode)
+                self._loaded_from_day = last_day + 1
+                self._store.history_pending = True
+                self._store.rebuild_indexes(recompute_totals=False)
+            return int(reader.header.get("journal_seq", 0))
+        except (json.JSONDecodeError, FileNotFoundError, IOError) as e:
+            print(f"Error loading data from {self.data_file}: {e}. Starting with empty data.")
+            self._store = TransactionStore(self.verify_totals)
+            self._history = None
+            return 0
+
+    def _load_sharded(self, progress):
+        try:
+            with open(self.manifest_file, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"unsupported manifest version {manifest.get('version')}")
+            shards = sorted(manifest["shards"], key=lambda entry: entry["year"], reverse=True)
+            stop_year = None
+            if self.window_days:
+                stop_year = year_of_day(QDate.currentDate().toJulianDay() - self.window_days)
+            recent = [entry for entry in shards if stop_year is None or entry["year"] >= stop_year]
+            older = shards[len(recent):]
+
+            for rows in read_shards([os.path.join(self.shard_dir, entry["file"]) for entry in recent], progress):
+                self._store.extend(map(transaction_from_row, rows), reindex=False)
+        except (json.JSONDecodeError, KeyError, ValueError, IOError) as e:
+            print(f"Error loading data from {self.shard_dir}: {e}. Starting with empty data.")
+            self._store = TransactionStore(self.verify_totals)
+            return 0
+
+        if older:
+            # Older years stay on disk; their totals come from the manifest,
+            # in ascending day order like a single snapshot's table.
+            day_parser = DayParser()
+            self._store.load_day_totals(*self._parse_day_totals(
+                [bucket for entry in reversed(shards) for bucket in entry["day_totals"]], day_parser
+            ))
+            self._history = (
+                iter_shard_records([os.path.join(self.shard_dir, entry["file"]) for entry in older]),
+                functools.partial(transaction_from_dict, day_parser=day_parser),
+            )
+            self._loaded_from_day = first_day_of_year(stop_year)
+            self._store.history_pending = True
+            self._store.rebuild_indexes(recompute_totals=False)
+        else:
+            self._store.rebuild_indexes()
+        self._shards = {entry["year"]: entry for entry in shards}
+        return int(manifest.get("journal_seq", 0))
+
+    def _load_compressed(self, progress):
+        try:
+            snapshot = CompressedSnapshot(self.compressed_file)
+            # Chunks are newest first; with a window, read up to and including
+            # the chunk that reaches past its start.
+            loaded = len(snapshot.chunks)
+            if self.window_days:
+                stop_day = QDate.currentDate().toJulianDay() - self.window_days
+                loaded = min(loaded, sum(1 for chunk in snapshot.chunks if chunk[5] >= stop_day) + 1)
+            for columns in snapshot.read_chunks(snapshot.chunks[:loaded], progress):
+                # Chunk codes index the chunk's own key lists; map them to ours.
+                type_map = np.array([TYPES.code(key) for key in columns["types"]], dtype=np.int8)
+                category_map = np.array([CATEGORIES.code(key) for key in columns["categories"]], dtype=np.int16)
+                self._store.extend_columns(
+                    columns["ids"], columns["days"], columns["descriptions"], type_map[columns["type_codes"]],
+                    columns["amounts"], category_map[columns["category_codes"]], reindex=False
+                )
+        except (ValueError, KeyError, IOError, zlib.error, lzma.LZMAError) as e:
+            print(f"Error loading data from {self.compressed_file}: {e}. Starting with empty data.")
+            self._store = TransactionStore(self.verify_totals)
+            return 0
+
+        if loaded < len(snapshot.chunks):
+            self._store.load_day_totals(*self._parse_day_totals(snapshot.day_totals, DayParser()))
+            self._history = (snapshot.iter_rows(snapshot.chunks[loaded:]), transaction_from_row)
+            # The next chunk may hold more rows of the oldest day loaded.
+            self._loaded_from_day = snapshot.chunks[loaded - 1][5] + 1
+            self._store.history_pending = True
+            self._store.rebuild_indexes(recompute_totals=False)
+        else:
+            self._store.rebuild_indexes()
+        return int(snapshot.journal_seq)
+
+    def _read_records(self, records, decode, stop_day=None):
+        # Adds records to the store until one dated before stop_day has been
+        # read. Returns (exhausted, day of the last record read).
+        chunk = []
+        last_day = None
+        exhausted = True
+        for t_data in records:
+            transaction = decode(t_data)
+            if transaction is None:
+                continue
+            last_day = transaction.day
+            if transaction.id in self._shadowed_ids:
+                # Replaced (or since deleted) by a later add; the persisted
+                # totals still count this version, and its year must be rewritten.
+                self._store.discount(transaction)
+                self._mark_dirty(transaction.day)
+            else:
+                chunk.append(transaction)
+            if len(chunk) >= LOAD_CHUNK_ROWS:
+                self._store.extend(chunk, reindex=False)
+                chunk = []
+            if stop_day is not None and last_day < stop_day:
+                exhausted = False
+                break
+        self._store.extend(chunk, reindex=False)
+        return exhausted, last_day
+
+    def _parse_day_totals(self, day_totals, day_parser):
+        days, type_codes, category_codes, amounts, counts = zip(*day_totals) if day_totals else ((),) * 5
+        return (
+            np.array([day_parser(date_text) for date_text in days], dtype=np.int64),
+            np.array([TYPES.code(type_key) for type_key in type_codes], dtype=np.int64),
+            np.array([CATEGORIES.code(category_key) for category_key in category_codes], dtype=np.int64),
+            np.array(amounts, dtype=np.float64),
+            np.array(counts, dtype=np.int64),
+        )
+
+    def _load_history(self, until_day=None):
+        # Faults in snapshot rows older than the startup window: all of them,
+        # or just enough that every row dated on or after until_day is loaded.
+        with self._lock:
+            if self._history is None or (until_day is not None and until_day >= self._loaded_from_day):
+                return
+            records, decode = self._history
+            recompute_totals = False
+            try:
+                exhausted, last_day = self._read_records(records, decode, until_day)
+            except (json.JSONDecodeError, IOError, zlib.error, lzma.LZMAError) as e:
+                print(f"Error loading older transactions: {e}. Keeping what was read.")
+                # The persisted totals include the rows that could not be read.
+                exhausted = recompute_totals = True
+            if exhausted:
+                self._close_history()
+            else:
+                self._loaded_from_day = last_day + 1
+            self._store.rebuild_indexes(recompute_totals=recompute_totals)
+
+    def _close_history(self):
+        if self._history is not None:
+            self._history[0].close()
+            self._history = None
+        self._shadowed_ids = set()
+        self._store.history_pending = False
+
+    def _find(self, transaction_id):
+        row = self._store.find(transaction_id)
+        if row < 0 and self._history is not None:
+            self._load_history()
+            row = self._store.find(transaction_id)
+        return row
+
+    def _load_binary(self, progress):
+        try:
+            snapshot = BinarySnapshot(self.binary_file)
+        except (ValueError, IOError) as e:
+            print(f"Error loading data from {self.binary_file}: {e}. Starting with empty data.")
+            return 0
+        if progress is not None:
+            size = os.path.getsize(self.binary_file)
+            if progress(size, size) is False:
+                snapshot.close()
+                raise LoadCancelled(self.binary_file)
+        self._store.load_binary(snapshot)
+        return snapshot.journal_seq
+
+    def _snapshot_paths(self):
+        return {
+            "json": self.data_file, "binary": self.binary_file, "sharded": self.manifest_file,
+            "compressed": self.compressed_file,
+        }
+
+    def watched_paths(self):
+        # Everything another writer could change: the data directory (for
+        # files replaced or created), the shard directory and the files in it.
+        paths = [self.data_dir, self.shard_dir, self.journal_file] + list(self._snapshot_paths().values())
+        return [path for path in paths if os.path.exists(path)]
+
+    def _file_signature(self):
+        signature = []
+        for path in list(self._snapshot_paths().values()) + [self.journal_file, self._journal.rotated_path]:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return signature
+
+    def has_external_changes(self):
+        # None while one of our own writes is in progress: the files are
+        # mid-change and would look like someone else's work.
+        if not self._io_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._signature is not None and self._file_signature() != self._signature
+        finally:
+            self._io_lock.release()
+
+    def reload_external_changes(self, progress=None):
+        # Re-reads the files and applies whatever differs from the store, by
+        # id, through the same row updates as local edits, so indexes and
+        # totals are adjusted rather than rebuilt. Returns a ChangeSet.
+        self.flush()
+        with self._io_lock, self._lock:
+            self._load_history()
+            disk = FileBackend(self.data_dir, self.verify_totals, self.snapshot_format, 0, self.compression)
+            disk._read_files(progress)
+            changes = self._apply_disk_store(disk._store)
+            # Our journal handle may point at a file that has been replaced, and
+            # new records must sort after whatever the other writer recorded.
+            self._journal.close()
+            self._journal.last_seq = max(self._journal.last_seq, disk._journal.last_seq)
+            self._shards = disk._shards
+            self._dirty_years = disk._dirty_years
+            self._signature = self._file_signature()
+        if not changes.reset:
+            disk._store.close()
+        return changes
+
+    def _apply_disk_store(self, theirs):
+        ours = self._store
+        our_rows = ours.live_rows()
+        their_rows = theirs.live_rows()
+        our_columns = ours.export_columns(our_rows)
+        their_columns = theirs.export_columns(their_rows)
+        unmatched = dict(zip(our_columns["ids"], range(len(our_rows))))
+        added = []
+        matched_ours = []
+        matched_theirs = []
+        for i, transaction_id in enumerate(their_columns["ids"]):
+            j = unmatched.pop(transaction_id, None)
+            if j is None:
+                added.append(i)
+            else:
+                matched_ours.append(j)
+                matched_theirs.append(i)
+        removed = list(unmatched.values())
+        mine = np.array(matched_ours, dtype=np.int64)
+        theirs_matched = np.array(matched_theirs, dtype=np.int64)
+        differs = np.zeros(len(mine), dtype=bool)
+        for name in ("dates", "amounts", "type_codes", "category_codes"):
+            differs |= our_columns[name][mine] != their_columns[name][theirs_matched]
+        our_descriptions = our_columns["descriptions"]
+        their_descriptions = their_columns["descriptions"]
+        differs |= np.array([our_descriptions[j] != their_descriptions[i]
+                             for j, i in zip(matched_ours, matched_theirs)], dtype=bool)
+        updated = [(j, i) for j, i, changed in zip(matched_ours, matched_theirs, differs.tolist()) if changed]
+
+        changes = ChangeSet(
+            [their_columns["ids"][i] for i in added],
+            [their_columns["ids"][i] for _, i in updated],
+            [our_columns["ids"][j] for j in removed],
+        )
+        if len(changes) > EXTERNAL_SWAP_RATIO * max(len(ours), 1) and len(changes) > LOAD_CHUNK_ROWS:
+            # Cheaper to take the reloaded store as it is. The old one may
+            # still map a binary snapshot, so release it first.
+            ours.close()
+            self._store = theirs
+            changes.reset = True
+            return changes
+        for j in removed:
+            ours.remove_row(int(our_rows[j]))
+        for j, i in updated:
+            ours.set_row(int(our_rows[j]), theirs.transaction(int(their_rows[i])))
+        for i in added:
+            ours.append(theirs.transaction(int(their_rows[i])))
+        return changes
+
+    def _mark_dirty(self, day):
+        self._dirty_years.add(year_of_day(day))
+
+    def has_data(self):
+        return any(os.path.exists(path) for path in self._snapshot_paths().values()) \
+            or os.path.exists(self.journal_file) or os.path.exists(self._journal.rotated_path)
+
+    def _replay_journal(self, snapshot_seq):
+        for entry in self._journal.replay(after_seq=snapshot_seq):
+            op = entry.get("op")
+            transaction_id = entry.get("id")
+            if op in ("add", "edit"):
+                transaction = transaction_from_dict(entry.get("transaction", {}))
+                if transaction is None:
+                    continue
+                # Upserts keep replay idempotent if a compaction was interrupted.
+                if op == "add":
+                    if entry.get("replaced") and self._store.find(transaction.id) < 0:
+                        # It replaced a row that is still unread; reading it in now
+                        # keeps the persisted totals from counting both versions.
+                        self._load_history()
+                    self._upsert(transaction)
+                    continue
+                # An edit may change the id, so look up the id it was recorded under first.
+                row = self._find(transaction_id)
+                if row < 0:
+                    row = self._store.find(transaction.id)
+                if row >= 0:
+                    self._mark_dirty(self._store.day(row))
+                    self._store.set_row(row, transaction)
+                else:
+                    self._store.append(transaction)
+                self._mark_dirty(transaction.day)
+            elif op == "delete":
+                row = self._find(transaction_id)
+                if row >= 0:
+                    self._mark_dirty(self._store.day(row))
+                    self._store.remove_row(row)
+            else:
+                print(f"Warning: Unknown journal operation '{op}' (seq {entry.get('seq')}). Skipping.")
+
+        self._store.compact()
+
+    def _write_json(self, path, data_to_save):
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data_to_save, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, path)
+
+    def _write_snapshot(self, store, journal_seq):
+        target = self._snapshot_paths()[self.snapshot_format]
+        try:
+            if self.snapshot_format == "binary":
+                tmp_file = target + ".tmp"
+                write_binary_snapshot(tmp_file, store, journal_seq)
+                os.replace(tmp_file, target)
+            elif self.snapshot_format == "compressed":
+                tmp_file = target + ".tmp"
+                write_compressed_snapshot(tmp_file, store, journal_seq, self._format_day_totals(store), self.compression)
+                os.replace(tmp_file, target)
+            else:
+                # Newest first, with the per-day totals ahead of the records,
+                # so a windowed load can stop reading early.
+                self._write_json(target, {
+                    "journal_seq": journal_seq,
+                    "order": "newest_first",
+                    "day_totals": self._format_day_totals(store),
+                    "transactions": list(store.iter_dicts(newest_first=True)),
+                })
+        except IOError as e:
+            print(f"Error saving data to {target}: {e}")
+            return False
+        self._remove_stale_snapshots()
+        return True
+
+    def _write_shards(self, shard_stores, journal_seq, full):
+        # Writes the given years' shards under new names, then commits them by
+        # replacing the manifest; clean years keep their files and totals.
+        shards = {} if full or self._shards is None else dict(self._shards)
+        try:
+            os.makedirs(self.shard_dir, exist_ok=True)
+            for year, store in sorted(shard_stores.items()):
+                if not len(store):
+                    shards.pop(year, None)
+                    continue
+                file_name = shard_file_name(year, journal_seq)
+                self._write_json(os.path.join(self.shard_dir, file_name), {
+                    "journal_seq": journal_seq,
+                    "year": year,
+                    "order": "newest_first",
+                    "transactions": list(store.iter_dicts(newest_first=True)),
+                })
+                shards[year] = {
+                    "year": year, "file": file_name, "rows": len(store), "day_totals": self._format_day_totals(store)
+                }
+            self._write_json(self.manifest_file, {
+                "version": MANIFEST_VERSION,
+                "journal_seq": journal_seq,
+                "shards": [shards[year] for year in sorted(shards, reverse=True)],
+            })
+        except IOError as e:
+            print(f"Error saving data to {self.shard_dir}: {e}")
+            return False
+        self._shards = shards
+        remove_unreferenced_shards(self.shard_dir, os.path.basename(self.manifest_file), shards)
+        self._remove_stale_snapshots()
+        return True
+
+    def _remove_stale_snapshots(self):
+        # Snapshots in the formats not configured are now out of date.
+        for snapshot_format, path in self._snapshot_paths().items():
+            if snapshot_format == self.snapshot_format or not os.path.exists(path):
+                continue
+            try:
+                if snapshot_format == "sharded":
+                    shutil.rmtree(self.shard_dir)
+                else:
+                    os.remove(path)
+            except OSError as e:
+                print(f"Warning: Could not remove outdated snapshot {path}: {e}")
+
+    def _format_day_totals(self, store):
+        days, type_codes, category_codes, amounts, counts = store.day_buckets()
+        date_strings = {}
+        day_totals = []
+        for day, type_code, category_code, amount, count in zip(
+            days.tolist(), type_codes.tolist(), category_codes.tolist(), amounts.tolist(), counts.tolist()
+        ):
+            date_text = date_strings.get(day)
+            if date_text is None:
+                date_text = date_strings[day] = QDate.fromJulianDay(day).toString("yyyy-MM-dd")
+            day_totals.append([date_text, store.types.key(type_code), store.categories.key(category_code), amount, count])
+        return day_totals
+
+    def save(self):
+        # Full snapshot, written by the save worker; blocks until it is on disk.
+        if self._worker is not None:
+            self._worker.compact_now()
+
+    def _append_journal(self, entries):
+        # The save worker's batch writer.
+        with self._io_lock:
+            self._journal.append_entries(entries)
+            self._signature = self._file_signature()
+
+    def _record_mutation(self, op, transaction_id, transaction=None):
+        # Called with self._lock held so sequence numbers follow store order.
+        record = transaction_to_dict(transaction) if transaction is not None else None
+        entry = self._journal.make_entry(op, transaction_id, record)
+        self._worker.submit(entry["seq"], entry)
+
+    def _needs_compaction(self):
+        return self._journal.size() >= JOURNAL_COMPACT_THRESHOLD
+
+    def _compact(self):
+        # Runs on the save worker thread, which is the only writer of the journal.
+        with self._lock:
+            sharded = self.snapshot_format == "sharded"
+            # Only the changed years are rewritten once shards exist on disk;
+            # any other snapshot has to contain every row.
+            full = not sharded or self._shards is None
+            if full or self._shadowed_ids:
+                # A shadowed row can be in any year; reading it marks that year dirty.
+                self._load_history()
+            elif self._dirty_years:
+                self._load_history(first_day_of_year(min(self._dirty_years)))
+            dirty_years = self._dirty_years
+            if os.name == "nt":
+                # Windows refuses to replace or delete a file that is still mapped.
+                self._store.materialize()
+            if sharded:
+                years = years_of_days(self._store.live_days()) if full else sorted(dirty_years)
+                snapshot = {
+                    year: self._store.snapshot(self._store.select(QDate(year, 1, 1), QDate(year, 12, 31)))
+                    for year in years
+                }
+            else:
+                snapshot = self._store.snapshot()
+            self._dirty_years = set()
+            journal_seq = self._journal.last_seq
+            pending = self._worker.take_pending()
+        with self._io_lock:
+            try:
+                if pending:
+                    self._journal.append_entries(pending)
+                    pending = []
+                self._journal.rotate()
+            except (IOError, OSError) as e:
+                print(f"Error writing journal {self.journal_file}: {e}")
+                self._worker.requeue(pending)
+                self._restore_dirty_years(dirty_years)
+                return None
+            if sharded:
+                written = self._write_shards(snapshot, journal_seq, full)
+            else:
+                written = self._write_snapshot(snapshot, journal_seq)
+            if written:
+                self._journal.discard_rotated()
+            else:
+                self._restore_dirty_years(dirty_years)
+            self._signature = self._file_signature()
+        return journal_seq
+
+    def _restore_dirty_years(self, years):
+        # The snapshot was not written, so the next compaction still owes these.
+        with self._lock:
+            self._dirty_years |= years
+
+    def flush(self, timeout=None):
+        if self._worker is None:
+            return True
+        return self._worker.flush(timeout)
+
+    def close(self):
+        # False if some changes could not be written.
+        written = True
+        if self._worker is not None:
+            written = self._worker.close()
+            self._worker = None
+        self._close_history()
+        self._journal.close()
+        return written
+
+    def iter_all(self):
+        self._load_history()
+        return iter(TransactionView(self._store, self._store.all_rows()))
+
+    def _upsert(self, transaction):
+        # Adds or replaces by id and returns the replaced transaction, if it
+        # was loaded. Ids are only looked up among the loaded rows, so adding
+        # never reads in the history; an older row with the same id is
+        # shadowed instead (see _read_records()).
+        row = self._store.find(transaction.id)
+        previous = None
+        if row >= 0:
+            previous = self._store.transaction(row)
+            self._mark_dirty(previous.day)
+            self._store.set_row(row, transaction)
+        else:
+            if self._history is not None:
+                self._shadowed_ids.add(transaction.id)
+            self._store.append(transaction)
+        self._mark_dirty(transaction.day)
+        return previous
+
+    def add(self, transaction):
+        # Returns the transaction it replaced, if that one was loaded.
+        with self._lock:
+            previous = self._upsert(transaction)
+            self._record_mutation("add", transaction.id, transaction)
+            return previous
+
+    def add_many(self, transactions):
+        transactions = list(transactions)
+        if not transactions:
+            return 0
+        with self._lock:
+            # The indexes and totals are rebuilt once from every row.
+            self._load_history()
+            # Rows replaced by an upsert may live in other years.
+            replaced = [self._store.find(t.id) for t in transactions]
+            self._dirty_years.update(years_of_days(
+                [t.day for t in transactions] + [self._store.day(row) for row in replaced if row >= 0]
+            ))
+            self._store.extend(transactions)
+            entries = [self._journal.make_entry("add", t.id, transaction_to_dict(t)) for t in transactions]
+            for entry, row in zip(entries, replaced):
+                if row >= 0:
+                    # Tells replay the id is not new (see _replay_journal()).
+                    entry["replaced"] = True
+            self._worker.submit_many(entries[-1]["seq"], entries)
+        return len(transactions)
+
+    def edit(self, transaction_id, updated_transaction):
+        with self._lock:
+            row = self._find(transaction_id)
+            if row < 0:
+                return False
+            self._mark_dirty(self._store.day(row))
+            self._mark_dirty(updated_transaction.day)
+            self._store.set_row(row, updated_transaction)
+            self._record_mutation("edit", transaction_id, updated_transaction)
+            return True
+
+    def delete(self, transaction_id):
+        with self._lock:
+            row = self._find(transaction_id)
+            if row < 0:
+                return False
+            self._mark_dirty(self._store.day(row))
+            self._store.remove_row(row)
+            self._record_mutation("delete", transaction_id)
+            return True
+
+    def get(self, transaction_id):
+        row = self._find(transaction_id)
+        return self._store.transaction(row) if row >= 0 else None
+
+    def execute(self, query):
+        # See query.Query for the result shapes. Type and category groups come
+        # from the totals, so they never need the unread history.
+        if query.group_fields and not query.filters_rows() and set(query.group_fields) <= {"type", "category"}:
+            with self._lock:
+                return self._store.query_groups(query)
+        if self._history is not None:
+            self._load_history(query.start_day())
+        with self._lock:
+            if query.group_fields:
+                return self._store.query_groups(query)
+            rows = self._store.query_rows(query)
+        if query.fields:
+            return RecordView(self._store, rows, query.fields)
+        return TransactionView(self._store, rows)
+
+    def iter_records(self, start_date=None, end_date=None, category=None, text=None, chunk_size=EXPORT_CHUNK_ROWS):
+        # Export rows in date order, chunk_size tuples at a time.
+        if self._history is not None:
+            self._load_history(start_date.toJulianDay() if start_date else None)
+        if text:
+            query = Query().between(start_date, end_date).matching(text)
+            with self._lock:
+                rows = self._store.matching_rows(query.in_categories(category) if category else query)
+        else:
+            rows = self._store.select(start_date, end_date, category)
+        for start in range(0, len(rows), chunk_size):
+            with self._lock:
+                chunk = self._store.records(rows[start:start + chunk_size])
+            yield chunk
@@ -0,0 +1,456 @@
+import math
+import os
+import sqlite3
+from PyQt5.QtCore import QDate
+from spendwise.core.transaction import Transaction, DayParser
+from spendwise.core.exporters import EXPORT_CHUNK_ROWS
+from spendwise.core.changes import ChangeSet
+from spendwise.core.query import group_result
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type, category);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS category_totals (
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (type, category)
+);
+CREATE TRIGGER IF NOT EXISTS category_totals_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO category_totals (type, category, amount, count) VALUES (NEW.type, NEW.category, NEW.amount, 1)
+    ON CONFLICT (type, category) DO UPDATE SET amount = amount + NEW.amount, count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS category_totals_delete AFTER DELETE ON transactions BEGIN
+    UPDATE category_totals SET amount = amount - OLD.amount, count = count - 1
+    WHERE type = OLD.type AND category = OLD.category;
+    DELETE FROM category_totals WHERE type = OLD.type AND category = OLD.category AND count <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS category_totals_update AFTER UPDATE OF type, category, amount ON transactions BEGIN
+    UPDATE category_totals SET amount = amount - OLD.amount, count = count - 1
+    WHERE type = OLD.type AND category = OLD.category;
+    DELETE FROM category_totals WHERE type = OLD.type AND category = OLD.category AND count <= 0;
+    INSERT INTO category_totals (type, category, amount, count) VALUES (NEW.type, NEW.category, NEW.amount, 1)
+    ON CONFLICT (type, category) DO UPDATE SET amount = amount + NEW.amount, count = count + 1;
+END;
+"""
+
+# Trigram index over case-folded descriptions for substring search. It is
+# contentless, so the triggers hand it the folded text to add or remove.
+# Created separately because not every SQLite build has FTS5.
+TEXT_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS description_index USING fts5(
+    description, content='', tokenize='trigram case_sensitive 1'
+);
+CREATE TRIGGER IF NOT EXISTS description_index_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO description_index (rowid, description) VALUES (NEW.rowid, casefold(NEW.description));
+END;
+CREATE TRIGGER IF NOT EXISTS description_index_delete AFTER DELETE ON transactions BEGIN
+    INSERT INTO description_index (description_index, rowid, description)
+    VALUES ('delete', OLD.rowid, casefold(OLD.description));
+END;
+CREATE TRIGGER IF NOT EXISTS description_index_update AFTER UPDATE OF description ON transactions BEGIN
+    INSERT INTO description_index (description_index, rowid, description)
+    VALUES ('delete', OLD.rowid, casefold(OLD.description));
+    INSERT INTO description_index (rowid, description) VALUES (NEW.rowid, casefold(NEW.description));
+END;
+"""
+
+# Bumped whenever category_totals has to be rebuilt from the transactions table.
+TOTALS_VERSION = "1"
+# Likewise for description_index.
+TEXT_INDEX_VERSION = "1"
+# Trigrams can only narrow searches at least this long.
+TEXT_INDEX_MIN_LENGTH = 3
+
+COLUMNS = "id, date, description, type, amount, category"
+# SQL for each query.GROUP_FIELDS entry; dates are stored as yyyy-MM-dd.
+GROUP_EXPRESSIONS = {
+    "type": "type", "category": "category", "year": "substr(date, 1, 4)", "month": "substr(date, 1, 7)", "day": "date",
+}
+
+# Stores the ledger in a SQLite database and answers filters and sums with SQL,
+# so nothing is materialized in memory beyond what a query returns.
+class SqliteBackend:
+    def __init__(self, data_dir, verify_totals=False):
+        self.db_file = os.path.join(data_dir, "spendwise_data.sqlite3")
+        self.verify_totals = verify_totals
+        self._conn = None
+        self._text_index = False
+
+    def load(self, progress=None):
+        self._conn = sqlite3.connect(self.db_file)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE only fires the delete trigger with this enabled.
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        # Description matching has to agree with the file backend's str.casefold().
+        self._conn.create_function("casefold", 1, str.casefold, deterministic=True)
+        self._conn.executescript(SCHEMA)
+        if self._get_meta("totals_version") != TOTALS_VERSION:
+            self._rebuild_totals()
+        self._conn.commit()
+        try:
+            self._conn.executescript(TEXT_INDEX_SCHEMA)
+            if self._get_meta("text_index_version") != TEXT_INDEX_VERSION:
+                self._rebuild_text_index()
+            self._text_index = True
+        except sqlite3.OperationalError as e:
+            print(f"Warning: Description search index unavailable ({e}). Searching will scan descriptions.")
+            self._conn.rollback()
+        self._conn.commit()
+
+    def _rebuild_totals(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM category_totals")
+            self._conn.execute(
+                "INSERT INTO category_totals (type, category, amount, count) "
+                "SELECT type, category, SUM(amount), COUNT(*) FROM transactions GROUP BY type, category"
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('totals_version', ?)", (TOTALS_VERSION,)
+            )
+
+    def _rebuild_text_index(self):
+        with self._conn:
+            self._conn.execute("INSERT INTO description_index (description_index) VALUES ('delete-all')")
+            self._conn.execute(
+                "INSERT INTO description_index (rowid, description) "
+                "SELECT rowid, casefold(description) FROM transactions"
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('text_index_version', ?)", (TEXT_INDEX_VERSION,)
+            )
+
+    def _category_totals(self):
+        # (type, category) -> (amount, count), kept up to date by the triggers.
+        totals = {
+            (type_key, category_key): (amount, count)
+            for type_key, category_key, amount, count in self._conn.execute(
+                "SELECT type, category, amount, count FROM category_totals"
+            )
+        }
+        if self.verify_totals:
+            expected = {
+                (type_key, category_key): (amount, count)
+                for type_key, category_key, amount, count in self._conn.execute(
+                    "SELECT type, category, SUM(amount), COUNT(*) FROM transactions GROUP BY type, category"
+                )
+            }
+            if set(totals) != set(expected) or any(
+                not math.isclose(totals[key][0], amount, rel_tol=1e-9, abs_tol=1e-6) or totals[key][1] != count
+                for key, (amount, count) in expected.items()
+            ):
+                print(f"Warning: Running totals drifted from a full recompute ({totals} != {expected}). Rebuilding them.")
+                self._rebuild_totals()
+                totals = expected
+        return totals
+
+    def _totals_groups(self, query):
+        # Type and category group-bys over the whole ledger come from
+        # category_totals instead of a scan of the transactions.
+        grouped = {}
+        for (type_key, category_key), (amount, count) in self._category_totals().items():
+            if (query.types is not None and type_key not in query.types) or \
+                    (query.categories is not None and category_key not in query.categories):
+                continue
+            key = tuple(type_key if field == "type" else category_key for field in query.group_fields)
+            total, rows = grouped.get(key, (0.0, 0))
+            grouped[key] = (total + amount, rows + count)
+        keys = sorted(grouped)
+        start, stop = query.window(len(keys))
+        keys = keys[start:stop]
+        return group_result(keys, [grouped[key][0] for key in keys], [grouped[key][1] for key in keys], query.group_fields)
+
+    def has_data(self):
+        return os.path.exists(self.db_file)
+
+    def migrate_from(self, source_backend, progress=None):
+        # One-shot import of an existing ledger (e.g. spendwise_data.json).
+        # The source is only read, so its files are left untouched as a backup.
+        if self._get_meta("migrated_from") is not None:
+            return 0
+        source_backend.load_read_only(progress)
+        rows = (self._to_row(t) for t in source_backend.iter_all())
+        with self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR REPLACE INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (type(source_backend).__name__,)
+            )
+        source_backend.close()
+        return cursor.rowcount
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _to_row(self, t):
+        return (t.id, t.date.toString("yyyy-MM-dd"), t.description, t.type, t.amount, t.category)
+
+    def _from_row(self, row):
+        return Transaction(
+            id=row[0],
+            date=QDate.fromString(row[1], "yyyy-MM-dd"),
+            description=row[2],
+            type=row[3],
+            amount=row[4],
+            category=row[5]
+        )
+
+    def _where(self, start_date=None, end_date=None, category=None, text=None):
+        clauses = []
+        params = []
+        if text:
+            self._text_clauses(text, clauses, params)
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(start_date.toString("yyyy-MM-dd"))
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(end_date.toString("yyyy-MM-dd"))
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def _text_clauses(self, text, clauses, params):
+        # text is already case-folded. The trigram index narrows the rows;
+        # instr() then checks the actual substring.
+        if self._text_index and len(text) >= TEXT_INDEX_MIN_LENGTH:
+            clauses.append("rowid IN (SELECT rowid FROM description_index WHERE description_index MATCH ?)")
+            params.append('"' + text.replace('"', '""') + '"')
+        clauses.append("instr(casefold(description), ?) > 0")
+        params.append(text)
+
+    def save(self):
+        self._conn.commit()
+
+    def flush(self, timeout=None):
+        # Every mutation is committed as it happens.
+        return True
+
+    def watched_paths(self):
+        # SQLite coordinates concurrent writers itself; nothing to watch.
+        return []
+
+    def has_external_changes(self):
+        return False
+
+    def reload_external_changes(self, progress=None):
+        return ChangeSet()
+
+    def close(self):
+        # Every change is committed as it is made.
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        return True
+
+    def iter_all(self):
+        for row in self._conn.execute(f"SELECT {COLUMNS} FROM transactions ORDER BY date"):
+            yield self._from_row(row)
+
+    def add(self, transaction):
+        # Returns the transaction it replaced, if any.
+        with self._conn:
+            previous = self.get(transaction.id)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                self._to_row(transaction)
+            )
+        return previous
+
+    def add_many(self, transactions):
+        with self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR REPLACE INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._to_row(t) for t in transactions)
+            )
+        return max(cursor.rowcount, 0)
+
+    def edit(self, transaction_id, updated_transaction):
+        row = self._to_row(updated_transaction)
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE transactions SET id = ?, date = ?, description = ?, type = ?, amount = ?, category = ? "
+                "WHERE id = ?", row + (transaction_id,)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, transaction_id):
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+        return cursor.rowcount > 0
+
+    def get(self, transaction_id):
+        row = self._conn.execute(
+            f"SELECT {COLUMNS} FROM transactions WHERE id = ?", (transaction_id,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def _query_where(self, query):
+        where, params = self._where(query.start_date, query.end_date)
+        clauses = [where[len(" WHERE "):]] if where else []
+        for column, keys in (("type", query.types), ("category", query.categories)):
+            if keys is not None:
+                keys = sorted(keys)
+                clauses.append(f"{column} IN ({', '.join('?' * len(keys))})" if keys else "0")
+                params.extend(keys)
+        if query.min_amount is not None:
+            clauses.append("amount >= ?")
+            params.append(query.min_amount)
+        if query.max_amount is not None:
+            clauses.append("amount <= ?")
+            params.append(query.max_amount)
+        if query.text:
+            self._text_clauses(query.text, clauses, params)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def execute(self, query):
+        # See query.Query for the result shapes. Type and category groups of
+        # the whole ledger come from the running totals; otherwise SQLite
+        # plans the WHERE clause against the date, (category, date) and
+        # (type, category) indexes.
+        if query.group_fields and set(query.group_fields) <= {"type", "category"} and not query.filters_rows() \
+                and query.start_date is None and query.end_date is None:
+            return self._totals_groups(query)
+        where, params = self._query_where(query)
+        start = query.offset
+        count = -1 if query.count is None else query.count
+        if query.group_fields:
+            groups = ", ".join(GROUP_EXPRESSIONS[field] for field in query.group_fields)
+            rows = self._conn.execute(
+                f"SELECT {groups}, SUM(amount), COUNT(*) FROM transactions{where} "
+                f"GROUP BY {groups} ORDER BY {groups} LIMIT ? OFFSET ?", params + [count, start]
+            ).fetchall()
+            width = len(query.group_fields)
+            return group_result([row[:width] for row in rows], [row[width] for row in rows],
+                                [row[width + 1] for row in rows], query.group_fields)
+        if query.fields:
+            columns = ", ".join("date" if field == "day" else field for field in query.fields)
+            convert = self._fields_converter(query.fields)
+        else:
+            columns, convert = COLUMNS, self._from_row
+        return SqliteView(self._conn, columns, where, self._order_clause(query.order), params, start, count,
+                          convert, query.fields)
+
+    def _order_clause(self, order):
+        # ORDER BY terms for Query.order_by(). Each page of a cursor sorts
+        # again, so descriptions compare with the built-in NOCASE collation
+        # (ASCII case only) rather than casefold().
+        field, descending = order or ("date", False)
+        terms = []
+        if field == "description":
+            terms.append("description COLLATE NOCASE")
+        elif field in ("amount", "type", "category"):
+            terms.append(field)
+        terms += ["date", "rowid"]
+        direction = " DESC" if descending else ""
+        return ", ".join(term + direction for term in terms)
+
+    def _fields_converter(self, fields):
+        # Turns a row of Query.select() columns into the projected tuple.
+        day_parser = DayParser()
+        converters = [
+            day_parser if field == "day" else (lambda text: QDate.fromString(text, "yyyy-MM-dd")) if field == "date"
+            else None for field in fields
+        ]
+        return lambda row: tuple(
+            value if convert is None else convert(value) for value, convert in zip(row, converters)
+        )
+
+    def iter_records(self, start_date=None, end_date=None, category=None, text=None, chunk_size=EXPORT_CHUNK_ROWS):
+        # Export rows in date order, chunk_size tuples at a time.
+        where, params = self._where(start_date, end_date, category, text.casefold() if text else None)
+        cursor = self._conn.execute(f"SELECT {COLUMNS} FROM transactions{where} ORDER BY date", params)
+        day_parser = DayParser()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [
+                (transaction_id, day_parser(date_text), description, type_key, amount, category_key)
+                for transaction_id, date_text, description, type_key, amount, category_key in rows
+            ]
+
+
+# Read-only sequence over the rows of a SQLite row query, sized and indexable
+# like store.TransactionView and store.RecordView. Nothing is fetched up front:
+# len() counts the matching rows, indexing fetches the chunk holding the row,
+# and each iteration runs the query again a chunk at a time, so every read
+# sees the table as it is then.
+class SqliteView:
+    CHUNK_ROWS = EXPORT_CHUNK_ROWS
+
+    def __init__(self, conn, columns, where, order, params, start, count, convert, fields=None):
+        self._conn = conn
+        self._columns = columns
+        self._where = where
+        self._order = order
+        self._params = params
+        self._start = start
+        # -1 means no limit, as in SQL.
+        self._count = count
+        self._convert = convert
+        self.fields = fields
+        self._length = None
+        self._chunk_start = None
+        self._chunk = []
+
+    def _fetch(self, start, count):
+        return self._conn.execute(
+            f"SELECT {self._columns} FROM transactions{self._where} ORDER BY {self._order} LIMIT ? OFFSET ?",
+            self._params + [count, self._start + start]
+        )
+
+    def __len__(self):
+        # The window's size does not depend on the order, so the count skips the sort.
+        if self._length is None:
+            self._length = self._conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM transactions{self._where} LIMIT ? OFFSET ?)",
+                self._params + [self._count, self._start]
+            ).fetchone()[0]
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [self._convert(row) for row in self._fetch(start, max(stop - start, 0))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        chunk_start = index - index % self.CHUNK_ROWS
+        if chunk_start != self._chunk_start:
+            rows = self._fetch(chunk_start, self.CHUNK_ROWS)
+            self._chunk = [self._convert(row) for row in rows]
+            self._chunk_start = chunk_start
+        return self._chunk[index - chunk_start]
+
+    def __iter__(self):
+        cursor = self._fetch(0, self._count)
+        while True:
+            rows = cursor.fetchmany(self.CHUNK_ROWS)
+            if not rows:
+                return
+            for row in rows:
+                yield self._convert(row)
@@ -0,0 +1,212 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from spendwise.core.rollup import group_buckets
+from spendwise.core.store import build_indexes
+
+MAGIC = b"SWSNAP01"
+FORMAT_VERSION = 1
+# Magic, then the byte length of the JSON header that follows it.
+PREAMBLE = struct.Struct("<8sQ")
+ALIGNMENT = 8
+
+
+def _padding(length):
+    return -length % ALIGNMENT
+
+
+# Snapshot layout: a JSON header describing the sections, then fixed-width
+# little-endian columns (date, amount, type, category), offsets tables and
+# UTF-8 heaps for ids and descriptions, the sorted date and category index
+# keys, a sorted id permutation for lookups, and the per-day totals table.
+# Every section is 8-byte aligned so it can be mapped as a NumPy array.
+def write_binary_snapshot(path, store, journal_seq):
+    columns = store.export_columns()
+    rows = len(columns["dates"])
+    date_keys, category_postings = build_indexes(columns["dates"], columns["category_codes"], np.arange(rows))
+    category_keys = [keys for _, keys in category_postings]
+    bounds = np.cumsum([0] + [len(keys) for keys in category_keys]).tolist()
+    encoded_ids = [transaction_id.encode("utf-8") for transaction_id in columns["ids"]]
+    id_order = np.argsort(np.array(encoded_ids, dtype=bytes), kind="stable") if rows else np.empty(0)
+    id_offsets, id_heap = _string_table(encoded_ids)
+    description_offsets, description_heap = _string_table(
+        [description.encode("utf-8") for description in columns["descriptions"]]
+    )
+    bucket_days, bucket_types, bucket_categories, bucket_amounts, bucket_counts = group_buckets(
+        columns["dates"], columns["type_codes"], columns["category_codes"], columns["amounts"]
+    )
+
+    sections = [
+        ("dates", np.asarray(columns["dates"], dtype="<i4")),
+        ("amounts", np.asarray(columns["amounts"], dtype="<f8")),
+        ("type_codes", np.asarray(columns["type_codes"], dtype="i1")),
+        ("category_codes", np.asarray(columns["category_codes"], dtype="<i2")),
+        ("id_offsets", id_offsets),
+        ("id_heap", id_heap),
+        ("description_offsets", description_offsets),
+        ("description_heap", description_heap),
+        ("id_order", np.asarray(id_order, dtype="<i8")),
+        ("date_keys", np.asarray(date_keys, dtype="<i8")),
+        ("category_keys", np.concatenate([np.empty(0, dtype="<i8")] + category_keys).astype("<i8")),
+        ("bucket_days", np.asarray(bucket_days, dtype="<i4")),
+        ("bucket_types", np.asarray(bucket_types, dtype="i1")),
+        ("bucket_categories", np.asarray(bucket_categories, dtype="<i2")),
+        ("bucket_amounts", np.asarray(bucket_amounts, dtype="<f8")),
+        ("bucket_counts", np.asarray(bucket_counts, dtype="<i8")),
+    ]
+    layout = {}
+    offset = 0
+    for name, array in sections:
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset += array.nbytes + _padding(array.nbytes)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "rows": rows,
+        "journal_seq": journal_seq,
+        "types": store.types.keys(),
+        "categories": store.categories.keys(),
+        "category_bounds": [
+            [code, bounds[i], bounds[i + 1]] for i, (code, _) in enumerate(category_postings)
+        ],
+        "sections": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    header += b" " * _padding(PREAMBLE.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header)
+        for _, array in sections:
+            f.write(array.tobytes())
+            f.write(b"\0" * _padding(array.nbytes))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _string_table(encoded):
+    offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    if encoded:
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype="u1")
+
+
+# Read side of write_binary_snapshot(). The file is mapped copy-on-write, so
+# arrays handed out are writable in memory while the file is never modified,
+# and only the pages that are actually read get loaded.
+class BinarySnapshot:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        try:
+            self._read_header()
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            self._mmap.close()
+            raise ValueError(f"not a valid SpendWise snapshot ({e})") from e
+
+    def _read_header(self):
+        magic, header_length = PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("bad magic number")
+        header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_length].decode("utf-8"))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"unsupported version {header['version']}")
+        self.rows = header["rows"]
+        self.journal_seq = header["journal_seq"]
+        self.types = header["types"]
+        self.categories = header["categories"]
+        self.category_bounds = header["category_bounds"]
+        self._sections = header["sections"]
+        self._data_start = PREAMBLE.size + header_length
+        for name, (offset, dtype, count) in self._sections.items():
+            if self._data_start + offset + np.dtype(dtype).itemsize * count > len(self._mmap):
+                raise ValueError(f"section {name} runs past the end of the file")
+
+    def array(self, name):
+        offset, dtype, count = self._sections[name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._data_start + offset)
+
+    def strings(self, name):
+        return StringColumn(self.array(name + "_offsets"), self._mmap, self._data_start + self._sections[name + "_heap"][0])
+
+    def id_index(self, ids):
+        return MappedIdIndex(ids, self.array("id_order"))
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Arrays still view the mapping; it is released with the last of them.
+            pass
+
+
+# Sorted-id lookup over a mapped snapshot: a bisection over the stored id
+# permutation, decoding about log2(n) ids per search.
+class MappedIdIndex:
+    def __init__(self, ids, order):
+        self._ids = ids
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, position):
+        return self._ids.original(int(self._order[position]))
+
+    def find(self, transaction_id):
+        position = bisect.bisect_left(self, transaction_id)
+        if position < len(self._order) and self[position] == transaction_id:
+            return int(self._order[position])
+        return -1
+
+
+# List-like column of strings backed by an offsets table and a UTF-8 heap in
+# the mapped file. Values are decoded on access; assignments and appends are
+# kept in memory on top of the mapped values.
+class StringColumn:
+    def __init__(self, offsets, buffer, heap_start):
+        self._offsets = offsets
+        self._buffer = buffer
+        self._heap_start = heap_start
+        self._base = len(offsets) - 1
+        self._changed = {}
+        self._tail = []
+
+    def __len__(self):
+        return self._base + len(self._tail)
+
+    def original(self, index):
+        start = self._heap_start + int(self._offsets[index])
+        end = self._heap_start + int(self._offsets[index + 1])
+        return self._buffer[start:end].decode("utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= self._base:
+            return self._tail[index - self._base]
+        value = self._changed.get(index)
+        return self.original(index) if value is None else value
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        if index >= self._base:
+            self._tail[index - self._base] = value
+        else:
+            self._changed[index] = value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, value):
+        self._tail.append(value)
+
+    def extend(self, values):
+        self._tail.extend(values)
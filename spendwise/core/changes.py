@@ -0,0 +1,19 @@
+# Transaction ids touched by one batch of changes, e.g. another SpendWise
+# instance or a sync client rewriting the data files. reset means the batch
+# was too large to apply row by row and views should simply reload.
+class ChangeSet:
+    def __init__(self, added=(), updated=(), removed=(), reset=False):
+        self.added = list(added)
+        self.updated = list(updated)
+        self.removed = list(removed)
+        self.reset = reset
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def __bool__(self):
+        return self.reset or len(self) > 0
+
+    def __repr__(self):
+        return (f"ChangeSet(added={len(self.added)}, updated={len(self.updated)}, "
+                f"removed={len(self.removed)}, reset={self.reset})")
@@ -0,0 +1,134 @@
+import json
+import lzma
+import os
+import struct
+import zlib
+import numpy as np
+from spendwise.core.parallel_load import map_pieces
+
+MAGIC = b"SWZSNP01"
+FORMAT_VERSION = 1
+# Footer length and magic, written after the JSON footer at the end of the file.
+TRAILER = struct.Struct("<Q8s")
+# Byte length of the JSON part at the start of a decompressed chunk.
+CHUNK_HEADER = struct.Struct("<I")
+# Rows per independently compressed chunk.
+CHUNK_ROWS = 20000
+# Fixed-width columns of a chunk, in the order they follow its JSON part.
+NUMERIC_COLUMNS = (("days", "<i4"), ("amounts", "<f8"), ("type_codes", "u1"), ("category_codes", "<u2"))
+
+COMPRESSORS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=1), lzma.decompress),
+}
+
+
+# Snapshot layout: the magic, then newest-first chunks of CHUNK_ROWS rows,
+# each compressed on its own. A decompressed chunk holds a JSON part (ids,
+# descriptions and the type/category keys its codes refer to) followed by
+# the fixed-width day, amount, type and category columns. A JSON footer
+# records the codec, where each chunk lives and which days it covers, and
+# the same per-day totals table as a JSON snapshot, so a windowed load can
+# skip old chunks. Chunks are independent, so they can be decoded in parallel.
+def write_compressed_snapshot(path, store, journal_seq, day_totals, codec="zlib"):
+    compress = COMPRESSORS[codec][0]
+    rows = store.rows_newest_first()
+    type_keys = store.types.keys()
+    category_keys = store.categories.keys()
+    chunks = []
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            columns = store.export_columns(rows[start:start + CHUNK_ROWS])
+            strings = json.dumps({
+                "ids": columns["ids"],
+                "descriptions": columns["descriptions"],
+                "types": type_keys,
+                "categories": category_keys,
+            }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            numeric = [
+                np.asarray(columns["dates" if name == "days" else name], dtype=dtype).tobytes()
+                for name, dtype in NUMERIC_COLUMNS
+            ]
+            raw = b"".join([CHUNK_HEADER.pack(len(strings)), strings] + numeric)
+            data = compress(raw)
+            f.write(data)
+            days = columns["dates"]
+            chunks.append([offset, len(data), len(raw), len(days), int(days[0]), int(days[-1])])
+            offset += len(data)
+        footer = json.dumps({
+            "version": FORMAT_VERSION,
+            "journal_seq": journal_seq,
+            "codec": codec,
+            "rows": len(rows),
+            "chunks": chunks,
+            "day_totals": day_totals,
+        }, ensure_ascii=False).encode("utf-8")
+        f.write(footer)
+        f.write(TRAILER.pack(len(footer), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_chunk(path, offset, length, codec, rows):
+    # Decompresses one chunk into a dict of columns; runs on a worker thread.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = COMPRESSORS[codec][1](f.read(length))
+    (strings_length,) = CHUNK_HEADER.unpack_from(raw, 0)
+    position = CHUNK_HEADER.size + strings_length
+    columns = json.loads(raw[CHUNK_HEADER.size:position].decode("utf-8"))
+    for name, dtype in NUMERIC_COLUMNS:
+        columns[name] = np.frombuffer(raw, dtype=dtype, count=rows, offset=position)
+        position += columns[name].nbytes
+    return columns
+
+
+class CompressedSnapshot:
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError("bad magic number")
+                f.seek(-TRAILER.size, os.SEEK_END)
+                footer_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+                if magic != MAGIC:
+                    raise ValueError("file is truncated")
+                f.seek(-TRAILER.size - footer_length, os.SEEK_END)
+                footer = json.loads(f.read(footer_length).decode("utf-8"))
+            if footer["version"] != FORMAT_VERSION:
+                raise ValueError(f"unsupported version {footer['version']}")
+            if footer["codec"] not in COMPRESSORS:
+                raise ValueError(f"unknown codec {footer['codec']}")
+        except (KeyError, TypeError, struct.error) as e:
+            raise ValueError(f"not a valid SpendWise snapshot ({e})") from e
+        self.journal_seq = footer["journal_seq"]
+        self.codec = footer["codec"]
+        self.rows = footer["rows"]
+        self.day_totals = footer["day_totals"]
+        # [offset, compressed length, raw length, rows, newest day, oldest day]
+        self.chunks = footer["chunks"]
+
+    def _piece(self, chunk):
+        return (self.path, chunk[0], chunk[1], self.codec, chunk[3])
+
+    def read_chunks(self, chunks, progress=None, max_workers=None):
+        # Yields each chunk's columns in order. Decompression releases the
+        # GIL and the rest of a chunk is cheap to decode, so threads do.
+        return map_pieces(read_chunk, [self._piece(chunk) for chunk in chunks],
+                          [chunk[2] for chunk in chunks], progress, max_workers, processes=False)
+
+    def iter_rows(self, chunks):
+        # (id, day, description, type, amount, category) rows of the given
+        # chunks, for faulting in history that was left unread at startup.
+        for chunk in chunks:
+            columns = read_chunk(*self._piece(chunk))
+            types = columns["types"]
+            categories = columns["categories"]
+            yield from zip(
+                columns["ids"], columns["days"].tolist(), columns["descriptions"],
+                [types[code] for code in columns["type_codes"].tolist()], columns["amounts"].tolist(),
+                [categories[code] for code in columns["category_codes"].tolist()],
+            )
@@ -1,13 +1,38 @@
 
-import json
 import os
 from collections import defaultdict
-from PyQt5.QtCore import QDate, QStandardPaths, QSettings, Qt, QCoreApplication
+from PyQt5.QtCore import (
+    QDate, QStandardPaths, QSettings, Qt, QCoreApplication, QObject, QTimer, QFileSystemWatcher, pyqtSignal
+)
 from spendwise.core.transaction import Transaction 
-
-class DataManager:
-    def __init__(self, settings, translator): 
-        self._transactions = []
+from spendwise.core.backends.file_backend import FileBackend, SNAPSHOT_FORMATS
+from spendwise.core.backends.sqlite_backend import SqliteBackend
+from spendwise.core.compressed_snapshot import COMPRESSORS
+from spendwise.core.importers import iter_statement_transactions
+from spendwise.core.exporters import export_records
+from spendwise.core.query import Query, QueryCursor
+from spendwise.core.suggestions import DescriptionSuggester
+
+# Watcher notifications arrive in bursts while a file is written; the check
+# runs once they have been quiet this long.
+EXTERNAL_CHANGE_DEBOUNCE_MS = 500
+# Polling fallback for file systems that don't deliver watcher events
+# (network shares, some sync clients). A check is a handful of stat() calls.
+EXTERNAL_CHANGE_POLL_MS = 5000
+
+class DataManager(QObject):
+    # Emitted with a ChangeSet after changes made to the data files by
+    # someone else have been applied.
+    external_changes_applied = pyqtSignal(object)
+
+    def __init__(self, settings, translator, progress_callback=None): 
+        super().__init__()
+        # progress_callback(bytes_read, total_bytes) is called while the ledger
+        # loads; returning False from it aborts startup with LoadCancelled.
+        self._backend = None
+        self._progress_callback = progress_callback
+        # Description autocomplete, built on first use.
+        self._suggester = None
         self._income_categories = [
             "category_salary", "category_freelance", "category_investment",
             "category_gift", "category_other_income"
@@ -40,63 +65,103 @@ class DataManager:
 
         self._load_data()
 
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_change_check)
+        self._watcher.fileChanged.connect(self._schedule_change_check)
+        self._change_timer = QTimer(self)
+        self._change_timer.setSingleShot(True)
+        self._change_timer.setInterval(EXTERNAL_CHANGE_DEBOUNCE_MS)
+        self._change_timer.timeout.connect(self.check_external_changes)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(EXTERNAL_CHANGE_POLL_MS)
+        self._poll_timer.timeout.connect(self.check_external_changes)
+        self._watch_data_files()
+        self._poll_timer.start()
+
+    def _create_backend(self):
+        backend_name = self.settings.value("storage_backend", "file", type=str)
+        # Debug aid: cross-check the running balance/category totals on every read.
+        verify_totals = self.settings.value("debug_verify_totals", False, type=bool)
+        snapshot_format = self.settings.value("snapshot_format", "json", type=str)
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            print(f"Warning: Unknown snapshot format '{snapshot_format}'. Using JSON.")
+            snapshot_format = "json"
+        compression = self.settings.value("snapshot_compression", "zlib", type=str)
+        if compression not in COMPRESSORS:
+            print(f"Warning: Unknown snapshot compression '{compression}'. Using zlib.")
+            compression = "zlib"
+        if backend_name == "sqlite":
+            backend = SqliteBackend(self.data_dir, verify_totals)
+            backend.load(self._progress_callback)
+            # The file backend's ledger, in whatever format it was saved in.
+            legacy_backend = FileBackend(self.data_dir, snapshot_format=snapshot_format, compression=compression)
+            if legacy_backend.has_data():
+                migrated = backend.migrate_from(legacy_backend, self._progress_callback)
+                if migrated:
+                    print(f"Migrated {migrated} transactions from {legacy_backend.source_file} to {backend.db_file}.")
+            return backend
+
+        if backend_name != "file":
+            print(f"Warning: Unknown storage backend '{backend_name}'. Using the JSON file backend.")
+        # Only this many recent days of a JSON snapshot are read at startup
+        # (0 reads everything); older rows load when something asks for them.
+        window_days = self.settings.value("history_window_days", 0, type=int)
+        backend = FileBackend(self.data_dir, verify_totals, snapshot_format, window_days, compression)
+        backend.load(self._progress_callback)
+        return backend
+
     def _load_data(self):
-        if not os.path.exists(self.data_file):
-            self._transactions = [] 
-            return
-
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            self._transactions = []
-            for t_data in data.get("transactions", []):
-                try:
-                    date_obj = QDate.fromString(t_data["date"], "yyyy-MM-dd")
-                    if not date_obj.isValid(): 
-                        date_obj = QDate.fromString(t_data["date"], Qt.ISODate)
-
-                    if not date_obj.isValid(): 
-                        print(f"Warning: Could not parse date '{t_data['date']}' for transaction ID {t_data.get('id')}. Skipping.")
-                        continue
-
-                    self._transactions.append(Transaction(
-                        id=t_data["id"],
-                        date=date_obj,
-                        description=t_data["description"],
-                        type=t_data["type"],
-                        amount=float(t_data["amount"]),
-                        category=t_data["category"]
-                    ))
-                except KeyError as e:
-                    print(f"Warning: Missing key {e} in transaction data: {t_data}. Skipping.")
-                except ValueError as e:
-                    print(f"Warning: Value error parsing transaction data ({e}): {t_data}. Skipping.")
-        except (json.JSONDecodeError, FileNotFoundError, IOError) as e:
-            print(f"Error loading data from {self.data_file}: {e}. Starting with empty data.")
-            self._transactions = []
+        if self._backend is not None and not self._backend.close():
+            print("Warning: Some changes could not be saved before reloading the data.")
+        self._backend = self._create_backend()
+        self._suggester = None
+
+    def _watch_data_files(self):
+        # Files replaced by an atomic rename drop out of the watcher, so the
+        # list is refreshed after every check.
+        watched = set(self._watcher.files() + self._watcher.directories())
+        missing = [path for path in self._backend.watched_paths() if path not in watched]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    def _schedule_change_check(self, _path=None):
+        self._change_timer.start()
+
+    def check_external_changes(self):
+        # Applies changes someone else made to the data files and returns
+        # them as a ChangeSet (None if there were none).
+        changed = self._backend.has_external_changes()
+        if changed is None:
+            # One of our own writes is in progress; look again afterwards.
+            self._change_timer.start()
+            return None
+        changes = None
+        if changed:
+            changes = self._backend.reload_external_changes()
+            if changes:
+                # The old versions of changed rows are gone; rebuild on next use.
+                self._suggester = None
+                self.external_changes_applied.emit(changes)
+            else:
+                changes = None
+        self._watch_data_files()
+        return changes
 
     def _save_data(self):
-        transactions_to_save = []
-        for t in self._transactions:
-            transactions_to_save.append({
-                "id": t.id,
-                "date": t.date.toString("yyyy-MM-dd"), 
-                "description": t.description,
-                "type": t.type,
-                "amount": t.amount,
-                "category": t.category
-            })
-
-        data_to_save = {
-            "transactions": transactions_to_save,
-        }
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-        except IOError as e:
-            print(f"Error saving data to {self.data_file}: {e}")
+        self._backend.save()
 
+    def flush(self, timeout=None):
+        # Waits until every mutation so far is durable; False on timeout.
+        return self._backend.flush(timeout)
+
+    def close(self):
+        watched = self._watcher.files() + self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._poll_timer.stop()
+        self._change_timer.stop()
+        # False if some changes could not be saved.
+        return self._backend.close()
 
     def _add_dummy_data(self):
         import uuid
@@ -104,8 +169,8 @@ class DataManager:
             Transaction(str(uuid.uuid4()), QDate.currentDate().addDays(-15), "Groceries and Produce", "expense", 50.75, "category_food"),
             Transaction(str(uuid.uuid4()), QDate.currentDate().addDays(-10), "Monthly Salary", "income", 2500.00, "category_salary"),
         ]
-        self._transactions.extend(dummy_data)
-        self._save_data() 
+        for t in dummy_data:
+            self._backend.add(t)
 
     def get_all_category_keys(self, type_filter=None):
         if type_filter == "income":
@@ -116,64 +181,109 @@ class DataManager:
             return sorted(list(set(self._income_categories + self._expense_categories)))
 
     def add_transaction(self, transaction):
-        self._transactions.append(transaction)
-        self._save_data()
+        # add() hands back the transaction it replaced, so a new id costs no lookup.
+        previous = self._backend.add(transaction)
+        if self._suggester is not None:
+            if previous is not None:
+                self._suggester.remove(*self._suggestion_record(previous))
+            self._suggester.add(*self._suggestion_record(transaction))
+
+    def add_transactions(self, transactions):
+        # Applies the whole batch with one index rebuild and one journal write.
+        if self._suggester is None:
+            return self._backend.add_many(transactions)
+        transactions = list(transactions)
+        # Imports may re-add (replace) transactions that already exist.
+        replaced = [t for t in map(self._backend.get, [t.id for t in transactions]) if t is not None]
+        added = self._backend.add_many(transactions)
+        for t in replaced:
+            self._suggester.remove(*self._suggestion_record(t))
+        self._suggester.add_many(map(self._suggestion_record, transactions))
+        return added
+
+    def import_statements(self, paths, mapping=None):
+        # CSV and OFX/QFX files; see importers.ImportMapping for the options.
+        return self.add_transactions(iter_statement_transactions(paths, mapping))
 
     def edit_transaction(self, transaction_id, updated_transaction_data):
-        for i, t in enumerate(self._transactions):
-            if t.id == transaction_id:
-                self._transactions[i] = updated_transaction_data
-                self._save_data()
-                return True
-        return False
+        previous = self._backend.get(transaction_id) if self._suggester is not None else None
+        edited = self._backend.edit(transaction_id, updated_transaction_data)
+        if edited and previous is not None:
+            self._suggester.remove(*self._suggestion_record(previous))
+            self._suggester.add(*self._suggestion_record(updated_transaction_data))
+        return edited
 
     def delete_transaction(self, transaction_id):
-        self._transactions = [t for t in self._transactions if t.id != transaction_id]
-        self._save_data()
+        previous = self._backend.get(transaction_id) if self._suggester is not None else None
+        deleted = self._backend.delete(transaction_id)
+        if deleted and previous is not None:
+            self._suggester.remove(*self._suggestion_record(previous))
+        return deleted
+
+    def _suggestion_record(self, t):
+        return (t.description, t.day, t.type, t.category, t.amount)
+
+    def _description_suggester(self):
+        if self._suggester is None:
+            self._suggester = DescriptionSuggester()
+            self._suggester.add_many(self.query(Query().select("description", "day", "type", "category", "amount")))
+        return self._suggester
+
+    def suggest_descriptions(self, text):
+        # Past descriptions starting with text, most used and most recent first.
+        return self._description_suggester().suggest(text)
+
+    def guess_transaction_details(self, description):
+        # (type, category, amount) a past description most likely goes with,
+        # or None.
+        return self._description_suggester().guess(description)
 
     def get_transaction_by_id(self, transaction_id):
-        for t in self._transactions:
-            if t.id == transaction_id:
-                return t
-        return None
+        return self._backend.get(transaction_id)
+
+    def _filter_args(self, filters):
+        if not filters:
+            return {}
+        category_key = filters.get("category")
+        return {
+            "start_date": filters.get("start_date"),
+            "end_date": filters.get("end_date"),
+            "category": category_key if category_key != "all" else None,
+            "text": filters.get("text") or None,
+        }
+
+    def query(self, query=None):
+        # Runs a query.Query against the backend's indexes: a lazy sequence of
+        # Transactions, of tuples after select(), or {group: (total, count)}
+        # after group_by().
+        return self._backend.execute(query or Query())
+
+    def open_cursor(self, query=None, offset=0):
+        # A query.QueryCursor over a row query, for reading a large result a
+        # page at a time, starting offset rows in.
+        return QueryCursor(self.query, query or Query(), offset)
 
     def get_transactions(self, filters=None):
-        current_transactions = list(self._transactions) 
-
-        if not filters or all(
-            (key_ not in filters or filters[key_] is None or (key_ == 'category' and filters[key_] == 'all'))
-            for key_ in ["start_date", "end_date", "category"]
-        ):
-             return current_transactions
-
-        start_date = filters.get("start_date")
-        end_date = filters.get("end_date")
-        category_key = filters.get("category") 
-
-        if start_date:
-            current_transactions = [
-                t for t in current_transactions if t.date >= start_date
-            ]
-        if end_date:
-            current_transactions = [
-                t for t in current_transactions if t.date <= end_date
-            ]
-        if category_key and category_key != "all": 
-            current_transactions = [
-                t for t in current_transactions if t.category == category_key
-            ]
-        return current_transactions
-
-    def get_balance(self): 
-        total_income = sum(t.amount for t in self._transactions if t.type == "income")
-        total_expenses = sum(t.amount for t in self._transactions if t.type == "expense")
-        return total_income - total_expenses
-
-    def get_expenses_by_category(self, transactions_list=None): 
-        source_transactions = transactions_list if transactions_list is not None else self._transactions
+        return self.query(Query.from_filters(filters))
+
+    def export_transactions(self, path, export_format=None, filters=None):
+        # Streams the (filtered) ledger to CSV, JSON Lines or the columnar
+        # format, picked from the extension unless given; returns an ExportResult.
+        return export_records(self._backend.iter_records(**self._filter_args(filters)), path, export_format)
+
+    def get_balance(self, filters=None): 
+        totals = self.query(Query.from_filters(filters).of_type("income", "expense").group_by("type"))
+        return totals.get("income", (0.0, 0))[0] - totals.get("expense", (0.0, 0))[0]
+
+    def get_expenses_by_category(self, transactions_list=None, filters=None): 
+        if transactions_list is None:
+            return {
+                category_key: total for category_key, (total, _) in
+                self.query(Query.from_filters(filters).of_type("expense").group_by("category")).items()
+            }
 
         expenses_by_cat = defaultdict(float)
-        for t in source_transactions:
+        for t in transactions_list:
             if t.type == "expense":
                 expenses_by_cat[t.category] += t.amount
         return dict(expenses_by_cat)
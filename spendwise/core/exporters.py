@@ -0,0 +1,211 @@
+import csv
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from PyQt5.QtCore import QDate
+
+EXPORT_FORMATS = ("csv", "jsonl", "columnar")
+EXPORT_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".swcol": "columnar"}
+FIELDS = ("id", "date", "description", "type", "amount", "category")
+# Backends hand rows to the exporters this many at a time, which bounds
+# memory regardless of ledger size.
+EXPORT_CHUNK_ROWS = 10000
+
+COLUMNAR_MAGIC = b"SWCOL001"
+COLUMNAR_VERSION = 1
+# Footer length and magic, written after the JSON footer at the end of the file.
+COLUMNAR_TRAILER = struct.Struct("<Q8s")
+
+
+class ExportResult:
+    def __init__(self, path, export_format, rows, seconds):
+        self.path = path
+        self.export_format = export_format
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return (f"ExportResult(path={self.path!r}, export_format={self.export_format!r}, rows={self.rows}, "
+                f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})")
+
+
+def export_format_for(path):
+    export_format = EXPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if export_format is None:
+        raise ValueError(f"cannot tell the export format of '{path}' (expected one of {', '.join(EXPORT_EXTENSIONS)})")
+    return export_format
+
+
+class _DayFormatter:
+    def __init__(self):
+        self._dates = {}
+
+    def __call__(self, day):
+        date_text = self._dates.get(day)
+        if date_text is None:
+            date_text = self._dates[day] = QDate.fromJulianDay(day).toString("yyyy-MM-dd")
+        return date_text
+
+
+# Chunks are lists of (id, day, description, type, amount, category) tuples,
+# with the date as a Julian day number; see the backends' iter_records().
+def write_csv(f, chunks):
+    format_day = _DayFormatter()
+    writer = csv.writer(f)
+    writer.writerow(FIELDS)
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(
+            (transaction_id, format_day(day), description, type_key, amount, category_key)
+            for transaction_id, day, description, type_key, amount, category_key in chunk
+        )
+        rows += len(chunk)
+    return rows
+
+
+def write_jsonl(f, chunks):
+    # One snapshot-style record per line.
+    format_day = _DayFormatter()
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    rows = 0
+    for chunk in chunks:
+        f.write("".join(
+            encode({
+                "id": transaction_id, "date": format_day(day), "description": description,
+                "type": type_key, "amount": amount, "category": category_key,
+            }) + "\n"
+            for transaction_id, day, description, type_key, amount, category_key in chunk
+        ))
+        rows += len(chunk)
+    return rows
+
+
+def _string_section(values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    if encoded:
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype="u1")
+
+
+# Columnar layout: the magic, then one row group per chunk with each column
+# zlib-compressed on its own (Julian days, amounts, type and category codes,
+# offsets tables and UTF-8 heaps for ids and descriptions), then a JSON
+# footer with the code dictionaries and where every column lives. Only one
+# row group is ever held in memory, on either side.
+def write_columnar(f, chunks):
+    types = {}
+    categories = {}
+    row_groups = []
+    offset = len(COLUMNAR_MAGIC)
+    rows = 0
+    f.write(COLUMNAR_MAGIC)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        ids, days, descriptions, type_keys, amounts, category_keys = zip(*chunk)
+        id_offsets, id_heap = _string_section(ids)
+        description_offsets, description_heap = _string_section(descriptions)
+        columns = [
+            ("dates", np.asarray(days, dtype="<i4")),
+            ("amounts", np.asarray(amounts, dtype="<f8")),
+            ("type_codes", np.asarray([types.setdefault(key, len(types)) for key in type_keys], dtype="u1")),
+            ("category_codes", np.asarray(
+                [categories.setdefault(key, len(categories)) for key in category_keys], dtype="<u2"
+            )),
+            ("id_offsets", id_offsets),
+            ("id_heap", id_heap),
+            ("description_offsets", description_offsets),
+            ("description_heap", description_heap),
+        ]
+        layout = {}
+        for name, array in columns:
+            data = zlib.compress(array.tobytes(), 1)
+            f.write(data)
+            layout[name] = [offset, len(data), array.dtype.str, len(array)]
+            offset += len(data)
+        row_groups.append({"rows": len(chunk), "columns": layout})
+        rows += len(chunk)
+
+    footer = json.dumps({
+        "version": COLUMNAR_VERSION,
+        "rows": rows,
+        "fields": FIELDS,
+        "types": list(types),
+        "categories": list(categories),
+        "row_groups": row_groups,
+    }, ensure_ascii=False).encode("utf-8")
+    f.write(footer)
+    f.write(COLUMNAR_TRAILER.pack(len(footer), COLUMNAR_MAGIC))
+    return rows
+
+
+def read_columnar(path):
+    # Yields the chunks write_columnar() was given, one row group at a time.
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a SpendWise columnar export")
+        f.seek(-COLUMNAR_TRAILER.size, os.SEEK_END)
+        footer_length, magic = COLUMNAR_TRAILER.unpack(f.read(COLUMNAR_TRAILER.size))
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is truncated")
+        f.seek(-COLUMNAR_TRAILER.size - footer_length, os.SEEK_END)
+        footer = json.loads(f.read(footer_length).decode("utf-8"))
+        if footer["version"] != COLUMNAR_VERSION:
+            raise ValueError(f"unsupported columnar export version {footer['version']}")
+        types = footer["types"]
+        categories = footer["categories"]
+
+        for group in footer["row_groups"]:
+            columns = {}
+            for name, (offset, length, dtype, count) in group["columns"].items():
+                f.seek(offset)
+                columns[name] = np.frombuffer(zlib.decompress(f.read(length)), dtype=dtype, count=count)
+            yield list(zip(
+                _decode_strings(columns["id_offsets"], columns["id_heap"]),
+                columns["dates"].tolist(),
+                _decode_strings(columns["description_offsets"], columns["description_heap"]),
+                [types[code] for code in columns["type_codes"].tolist()],
+                columns["amounts"].tolist(),
+                [categories[code] for code in columns["category_codes"].tolist()],
+            ))
+
+
+def _decode_strings(offsets, heap):
+    data = heap.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+_WRITERS = {
+    "csv": (write_csv, {"mode": "w", "newline": "", "encoding": "utf-8"}),
+    "jsonl": (write_jsonl, {"mode": "w", "encoding": "utf-8"}),
+    "columnar": (write_columnar, {"mode": "wb"}),
+}
+
+
+def export_records(chunks, path, export_format=None):
+    # Streams chunks into path (written next to it first, then moved into
+    # place) and reports how long it took.
+    export_format = export_format or export_format_for(path)
+    if export_format not in _WRITERS:
+        raise ValueError(f"unknown export format '{export_format}' (expected one of {', '.join(EXPORT_FORMATS)})")
+    write, open_args = _WRITERS[export_format]
+    tmp_file = path + ".tmp"
+    started = time.perf_counter()
+    try:
+        with open(tmp_file, **open_args) as f:
+            rows = write(f, chunks)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    return ExportResult(path, export_format, rows, time.perf_counter() - started)
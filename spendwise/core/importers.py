@@ -0,0 +1,221 @@
+import concurrent.futures
+import csv
+import multiprocessing
+import os
+import re
+import uuid
+from PyQt5.QtCore import QDate
+from spendwise.core.transaction import parse_day, transaction_from_row
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+_INCOME_WORDS = {"income", "credit", "cr", "deposit", "in"}
+_EXPENSE_WORDS = {"expense", "debit", "dr", "withdrawal", "payment", "out"}
+
+
+# Describes how statement columns map onto transaction fields. Columns are
+# header names (matched case-insensitively) or zero-based indexes. When no
+# type column is given, the sign of the amount decides: negative amounts
+# are expenses. Dates are tried against date_formats (Qt format strings)
+# after plain ISO dates.
+class ImportMapping:
+    def __init__(self, date="date", description="description", amount="amount", type=None, category=None,
+                 id=None, date_formats=("dd/MM/yyyy", "MM/dd/yyyy", "dd.MM.yyyy", "yyyyMMdd"),
+                 delimiter=",", decimal=".", has_header=True, encoding="utf-8-sig", category_map=None,
+                 default_income_category="category_other_income",
+                 default_expense_category="category_other_expense"):
+        self.date = date
+        self.description = description
+        self.amount = amount
+        self.type = type
+        self.category = category
+        self.id = id
+        self.date_formats = tuple(date_formats)
+        self.delimiter = delimiter
+        self.decimal = decimal
+        self.has_header = has_header
+        self.encoding = encoding
+        # Maps statement category labels to category keys; unmapped labels
+        # that are not already keys fall back to the defaults below.
+        self.category_map = dict(category_map or {})
+        self.default_income_category = default_income_category
+        self.default_expense_category = default_expense_category
+
+
+class _DateDecoder:
+    def __init__(self, formats):
+        self._formats = formats
+        self._days = {}
+
+    def __call__(self, text):
+        day = self._days.get(text)
+        if day is None and text not in self._days:
+            day = parse_day(text)
+            for date_format in self._formats:
+                if day is not None:
+                    break
+                date_obj = QDate.fromString(text, date_format)
+                if date_obj.isValid():
+                    day = date_obj.toJulianDay()
+            self._days[text] = day
+        return day
+
+
+def _parse_amount(text, decimal):
+    text = text.strip().replace(" ", "").replace("\u00a0", "")
+    negative = text.startswith("(") and text.endswith(")")
+    text = text.strip("()")
+    if decimal == ",":
+        text = text.replace(".", "").replace(",", ".")
+    else:
+        text = text.replace(",", "")
+    text = re.sub(r"[^0-9.+-]", "", text)
+    value = float(text)
+    return -value if negative else value
+
+
+def _record(mapping, transaction_id, day, description, amount, type_text=None, category_text=None):
+    # Plain tuples so records can cross process boundaries: type and
+    # category codes are only meaningful inside one process.
+    type_key = None
+    if type_text:
+        word = type_text.strip().lower()
+        if word in _INCOME_WORDS:
+            type_key = "income"
+        elif word in _EXPENSE_WORDS:
+            type_key = "expense"
+    if type_key is None:
+        type_key = "expense" if amount < 0 else "income"
+
+    category_key = None
+    if category_text:
+        category_key = mapping.category_map.get(category_text.strip(), category_text.strip())
+        if not category_key.startswith("category_"):
+            category_key = None
+    if category_key is None:
+        category_key = mapping.default_expense_category if type_key == "expense" else mapping.default_income_category
+
+    return (transaction_id or str(uuid.uuid4()), day, description.strip(), type_key, abs(amount), category_key)
+
+
+def _column_index(spec, header):
+    if spec is None or isinstance(spec, int):
+        return spec
+    wanted = spec.strip().lower()
+    for i, name in enumerate(header):
+        if name.strip().lower() == wanted:
+            return i
+    raise ValueError(f"column '{spec}' not found in header {header}")
+
+
+def read_csv(path, mapping):
+    # Yields statement rows one at a time without reading the whole file.
+    decode_date = _DateDecoder(mapping.date_formats)
+    with open(path, newline="", encoding=mapping.encoding) as f:
+        rows = csv.reader(f, delimiter=mapping.delimiter)
+        header = next(rows, []) if mapping.has_header else []
+        columns = [_column_index(spec, header) for spec in (
+            mapping.date, mapping.description, mapping.amount, mapping.type, mapping.category, mapping.id
+        )]
+        date_col, description_col, amount_col, type_col, category_col, id_col = columns
+        for line_number, row in enumerate(rows, start=2 if mapping.has_header else 1):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            try:
+                day = decode_date(row[date_col].strip())
+                if day is None:
+                    print(f"Warning: Could not parse date '{row[date_col]}' in {path} line {line_number}. Skipping.")
+                    continue
+                yield _record(
+                    mapping,
+                    row[id_col].strip() if id_col is not None else None,
+                    day,
+                    row[description_col],
+                    _parse_amount(row[amount_col], mapping.decimal),
+                    row[type_col] if type_col is not None else None,
+                    row[category_col] if category_col is not None else None,
+                )
+            except IndexError:
+                print(f"Warning: Too few columns in {path} line {line_number}. Skipping.")
+            except ValueError as e:
+                print(f"Warning: Could not parse {path} line {line_number} ({e}). Skipping.")
+
+
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+_OFX_FIELD = re.compile(r"<([A-Za-z0-9.]+)>([^<\r\n]*)")
+_OFX_ACCOUNT = re.compile(r"<ACCTID>([^<\r\n]*)", re.IGNORECASE)
+
+
+def read_ofx(path, mapping):
+    # Handles both SGML (OFX 1.x) and XML (OFX 2.x) statements by scanning
+    # for <STMTTRN> blocks chunk by chunk. FITIDs become stable ids, so
+    # importing the same statement twice updates rather than duplicates.
+    decode_date = _DateDecoder(("yyyyMMdd",))
+    account = ""
+    buffer = ""
+    with open(path, encoding=mapping.encoding, errors="replace") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            buffer += chunk
+            if not account:
+                match = _OFX_ACCOUNT.search(buffer)
+                if match:
+                    account = match.group(1).strip()
+            consumed = 0
+            for match in _OFX_TRANSACTION.finditer(buffer):
+                consumed = match.end()
+                fields = {name.upper(): value.strip() for name, value in _OFX_FIELD.findall(match.group(1))}
+                try:
+                    day = decode_date(fields.get("DTPOSTED", "")[:8])
+                    if day is None:
+                        print(f"Warning: Could not parse date '{fields.get('DTPOSTED')}' in {path}. Skipping.")
+                        continue
+                    fitid = fields.get("FITID")
+                    yield _record(
+                        mapping,
+                        f"ofx:{account}:{fitid}" if fitid else None,
+                        day,
+                        fields.get("NAME") or fields.get("MEMO") or fields.get("TRNTYPE", ""),
+                        # OFX amounts carry no grouping; a comma can only be the decimal mark.
+                        _parse_amount(fields["TRNAMT"].replace(",", "."), "."),
+                    )
+                except (KeyError, ValueError) as e:
+                    print(f"Warning: Could not parse transaction {fields.get('FITID')} in {path} ({e}). Skipping.")
+            buffer = buffer[consumed:]
+            if not chunk:
+                return
+
+
+def read_statement(path, mapping):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ofx", ".qfx"):
+        return read_ofx(path, mapping)
+    return read_csv(path, mapping)
+
+
+def parse_statement(path, mapping):
+    # Process pool entry point: parses one file completely.
+    return list(read_statement(path, mapping))
+
+
+def iter_statement_transactions(paths, mapping=None, max_workers=None):
+    # Yields Transactions from every file, in file order. Several files are
+    # parsed in parallel worker processes; a single file is streamed here.
+    mapping = mapping or ImportMapping()
+    paths = list(paths)
+    if len(paths) == 1:
+        record_lists = [read_statement(paths[0], mapping)]
+        executor = None
+    else:
+        # spawn rather than fork: the save worker thread may hold locks.
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        record_lists = executor.map(parse_statement, paths, [mapping] * len(paths))
+    try:
+        for records in record_lists:
+            for record in records:
+                yield transaction_from_row(record)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,122 @@
+import codecs
+import json
+import os
+import re
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+# Reads one top-level JSON object from a file and yields the items of the array
+# stored under `array_key` one at a time, so the whole document is never held
+# in memory. Every other top-level key ends up in `header` once iteration is
+# done. `progress(bytes_read, total_bytes)` is called after each chunk read;
+# returning False from it cancels the load with LoadCancelled.
+class JsonArrayReader:
+    def __init__(self, path, array_key, progress=None, chunk_size=READ_CHUNK_SIZE):
+        self.path = path
+        self.array_key = array_key
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.header = {}
+        self.bytes_read = 0
+        self.total_bytes = 0
+
+        self._file = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        with open(self.path, 'rb') as self._file:
+            self.total_bytes = os.fstat(self._file.fileno()).st_size
+            self._expect("{")
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                key = self._decode_value()
+                self._expect(":")
+                if key == self.array_key:
+                    yield from self._iter_array()
+                else:
+                    self.header[key] = self._decode_value()
+                separator = self._next_char()
+                if separator == "}":
+                    return
+                if separator != ",":
+                    self._fail(f"expected ',' or '}}' but found {separator!r}")
+
+    def _iter_array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            separator = self._next_char()
+            if separator == "]":
+                return
+            if separator != ",":
+                self._fail(f"expected ',' or ']' but found {separator!r}")
+
+    def _fill(self, size=0):
+        if self._eof:
+            return False
+        chunk = self._file.read(max(size, self.chunk_size))
+        self.bytes_read += len(chunk)
+        self._buf = self._buf[self._pos:] + self._decoder.decode(chunk, final=not chunk)
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        if self.progress is not None and self.progress(self.bytes_read, self.total_bytes) is False:
+            raise LoadCancelled(self.path)
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        if self._pos >= len(self._buf):
+            self._fail("unexpected end of file")
+        return self._buf[self._pos]
+
+    def _next_char(self):
+        char = self._peek()
+        self._pos += 1
+        return char
+
+    def _expect(self, char):
+        found = self._next_char()
+        if found != char:
+            self._fail(f"expected {char!r} but found {found!r}")
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # A number ending exactly at the buffer edge may continue in the next chunk.
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Grow the pending text geometrically so a value spanning many
+            # chunks is not re-parsed from its start once per chunk.
+            self._fill(len(self._buf) - self._pos)
+
+    def _fail(self, message):
+        raise json.JSONDecodeError(message, self._buf, self._pos)
@@ -0,0 +1,38 @@
+import concurrent.futures
+import multiprocessing
+from spendwise.core.json_stream import LoadCancelled
+
+# Snapshot pieces are parsed in worker processes once there is this much to
+# read; below it, starting the workers costs more than it saves.
+PARALLEL_LOAD_MIN_BYTES = 8 * 1024 * 1024
+
+
+def map_pieces(function, pieces, sizes, progress=None, max_workers=None, processes=True):
+    # Yields function(*piece) for every piece, in order, reporting
+    # progress(bytes_done, total_bytes) by the given piece sizes. Large loads
+    # are spread over a spawn-context process pool, so no locks held by this
+    # process (e.g. by the save worker) are inherited. With processes=False,
+    # for work that mostly releases the GIL (decompression), a thread pool is
+    # used whenever there is more than one piece.
+    total = sum(sizes)
+    executor = None
+    if len(pieces) > 1 and not processes:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    elif len(pieces) > 1 and total >= PARALLEL_LOAD_MIN_BYTES:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    if executor is not None:
+        results = executor.map(function, *zip(*pieces))
+    else:
+        results = (function(*piece) for piece in pieces)
+    done = 0
+    try:
+        for piece, size, result in zip(pieces, sizes, results):
+            done += size
+            if progress is not None and progress(done, total) is False:
+                raise LoadCancelled(piece[0])
+            yield result
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,147 @@
+import copy
+
+# Fields a query can project with select(); "day" is the Julian day number
+# behind "date", which is cheaper when no QDate is needed.
+QUERY_FIELDS = ("id", "date", "day", "description", "type", "amount", "category")
+# Fields a query can group by. Date buckets come back as "yyyy", "yyyy-MM"
+# and "yyyy-MM-dd" strings.
+GROUP_FIELDS = ("type", "category", "year", "month", "day")
+# Fields a query can order rows by with order_by().
+ORDER_FIELDS = ("date", "description", "type", "amount", "category")
+
+
+# Describes what to read from the ledger; DataManager.query() runs it. Every
+# method returns a new Query, so partial queries can be shared and extended:
+#
+#     Query().between(start, end).of_type("expense").group_by("category")
+#
+# Without select() or group_by() the result is a lazy sequence of
+# Transactions in date order (or order_by() order); with select() a lazy
+# sequence of tuples of the chosen fields; with group_by() a dict mapping each group (a plain value for
+# one field, a tuple for several) to a (total amount, row count) pair, in
+# group order. limit() applies to rows or groups alike.
+class Query:
+    def __init__(self):
+        self.start_date = None
+        self.end_date = None
+        self.types = None
+        self.categories = None
+        self.min_amount = None
+        self.max_amount = None
+        self.text = None
+        self.fields = None
+        self.group_fields = None
+        self.offset = 0
+        self.count = None
+        self.order = None
+
+    @classmethod
+    def from_filters(cls, filters):
+        # The filter dicts MainWindow passes around: start_date, end_date,
+        # category ("all" or None for every category) and description text.
+        query = cls()
+        if filters:
+            query = query.between(filters.get("start_date"), filters.get("end_date"))
+            category = filters.get("category")
+            if category and category != "all":
+                query = query.in_categories(category)
+            query = query.matching(filters.get("text"))
+        return query
+
+    def _with(self, **changes):
+        query = copy.copy(self)
+        query.__dict__.update(changes)
+        return query
+
+    def between(self, start_date=None, end_date=None):
+        return self._with(start_date=start_date, end_date=end_date)
+
+    def of_type(self, *types):
+        return self._with(types=frozenset(types))
+
+    def in_categories(self, *categories):
+        return self._with(categories=frozenset(categories))
+
+    def amount_between(self, minimum=None, maximum=None):
+        return self._with(min_amount=minimum, max_amount=maximum)
+
+    def matching(self, text):
+        # Case-insensitive substring of the description; empty matches all.
+        return self._with(text=text.casefold() if text else None)
+
+    def select(self, *fields):
+        unknown = [field for field in fields if field not in QUERY_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"cannot select {unknown or 'nothing'} (expected some of {', '.join(QUERY_FIELDS)})")
+        return self._with(fields=tuple(fields), group_fields=None)
+
+    def group_by(self, *fields):
+        unknown = [field for field in fields if field not in GROUP_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"cannot group by {unknown or 'nothing'} (expected some of {', '.join(GROUP_FIELDS)})")
+        return self._with(group_fields=tuple(fields), fields=None)
+
+    def limit(self, count, offset=0):
+        return self._with(count=count, offset=offset)
+
+    def order_by(self, field, descending=False):
+        # Rows sorted on field (descriptions ignoring case, types and
+        # categories by their stored keys), ties in date order; descending
+        # reverses the whole order.
+        if field not in ORDER_FIELDS:
+            raise ValueError(f"cannot order by {field!r} (expected one of {', '.join(ORDER_FIELDS)})")
+        return self._with(order=(field, descending))
+
+    def newest(self):
+        return self.order_by("date", descending=True)
+
+    def start_day(self):
+        return self.start_date.toJulianDay() if self.start_date else None
+
+    def end_day(self):
+        return self.end_date.toJulianDay() if self.end_date else None
+
+    def filters_rows(self):
+        # True when some predicate has to look at individual rows, i.e. the
+        # result cannot come from pre-aggregated totals.
+        return self.min_amount is not None or self.max_amount is not None or bool(self.text)
+
+    def window(self, length):
+        # The [start, stop) slice of a result of the given length.
+        start = min(self.offset, length)
+        stop = length if self.count is None else min(length, start + self.count)
+        return start, stop
+
+    def __repr__(self):
+        parts = [f"{name}={value!r}" for name, value in self.__dict__.items()
+                 if value is not None and value is not False and not (name == "offset" and value == 0)]
+        return f"Query({', '.join(parts)})"
+
+
+# Reads the rows of a row query a page at a time (see
+# DataManager.open_cursor()). Every fetch() runs the query for just the next
+# page, so what is held in memory follows the pages read, not the size of
+# the result.
+class QueryCursor:
+    def __init__(self, execute, query, offset=0):
+        self._execute = execute
+        self._query = query
+        self._offset = offset
+        self.exhausted = False
+
+    def fetch(self, count=None):
+        # Up to count more rows (all that are left for None) as a list.
+        page = list(self._execute(self._query.limit(count, self._offset)))
+        self._offset += len(page)
+        self.exhausted = count is None or len(page) < count
+        return page
+
+
+def group_result(keys, totals, counts, group_fields):
+    # Shapes parallel group key tuples, sums and counts into the dict a
+    # group_by() query returns.
+    single = len(group_fields) == 1
+    return {
+        key[0] if single else key: (total, count)
+        for key, total, count in zip(keys, totals, counts)
+    }
@@ -0,0 +1,155 @@
+import datetime
+import numpy as np
+from spendwise.core.transaction import JULIAN_ORDINAL_OFFSET
+
+# Julian day number of 1970-01-01, the epoch of numpy's datetime64.
+JULIAN_UNIX_EPOCH = 2440588
+
+
+def month_of_day(day):
+    d = datetime.date.fromordinal(day - JULIAN_ORDINAL_OFFSET)
+    return d.year * 12 + d.month - 1
+
+
+def first_day_of_month(month):
+    return datetime.date(month // 12, month % 12 + 1, 1).toordinal() + JULIAN_ORDINAL_OFFSET
+
+
+def months_of_days(days):
+    days = np.asarray(days, dtype=np.int64)
+    # datetime64[M] counts months from 1970-01; shift to year * 12 + month - 1.
+    months = (days - JULIAN_UNIX_EPOCH).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return months + 1970 * 12
+
+
+def group_buckets(bucket_keys, type_codes, category_codes, amounts, counts=None):
+    # Collapses rows (or finer buckets) into one entry per (bucket, type,
+    # category), returned as parallel arrays sorted by bucket.
+    bucket_keys = np.asarray(bucket_keys, dtype=np.int64)
+    combined = (bucket_keys << 32) | (np.asarray(type_codes, dtype=np.int64) << 16) \
+        | np.asarray(category_codes, dtype=np.int64)
+    groups, inverse = np.unique(combined, return_inverse=True)
+    sums = np.bincount(inverse, weights=amounts, minlength=len(groups))
+    if counts is None:
+        counts = np.bincount(inverse, minlength=len(groups))
+    else:
+        counts = np.bincount(inverse, weights=counts, minlength=len(groups)).astype(np.int64)
+    return groups >> 32, (groups >> 16) & 0xFFFF, groups & 0xFFFF, sums, counts
+
+
+def _bucket_slices(bucket_keys):
+    # Input is sorted by bucket, so each bucket's entries are one slice.
+    keys, starts = np.unique(bucket_keys, return_index=True)
+    bounds = starts.tolist()[1:] + [len(bucket_keys)]
+    return dict(zip(keys.tolist(), zip(starts.tolist(), bounds)))
+
+
+def _bucket_dict(type_codes, category_codes, amounts, counts):
+    return dict(zip(
+        zip(type_codes.tolist(), category_codes.tolist()),
+        map(list, zip(amounts.tolist(), counts.tolist()))
+    ))
+
+
+def _bucket_dicts(bucket_keys, type_codes, category_codes, amounts, counts):
+    return {
+        bucket_key: _bucket_dict(type_codes[start:end], category_codes[start:end], amounts[start:end], counts[start:end])
+        for bucket_key, (start, end) in _bucket_slices(bucket_keys).items()
+    }
+
+
+# Pre-aggregated sums keyed by (type code, category code) per day and per
+# month. A range total is the whole months inside the range plus the single
+# days of the partial months at either end, so its cost depends on the length
+# of the range, never on how many transactions it holds.
+class RollupCube:
+    def __init__(self):
+        self._days = {}
+        self._months = {}
+        # Day buckets from load_day_buckets() stay in the loaded arrays until a
+        # day is first read or changed: day -> (start, end) into _packed.
+        self._packed = None
+        self._packed_days = {}
+
+    def _unpack_day(self, day):
+        start, end = self._packed_days.pop(day)
+        self._days[day] = _bucket_dict(*(column[start:end] for column in self._packed))
+
+    def add(self, day, type_code, category_code, amount, sign):
+        key = (type_code, category_code)
+        if day in self._packed_days:
+            self._unpack_day(day)
+        self._add_to_bucket(self._days, day, key, amount, sign)
+        self._add_to_bucket(self._months, month_of_day(day), key, amount, sign)
+
+    def _add_to_bucket(self, buckets, bucket_key, key, amount, sign):
+        bucket = buckets.setdefault(bucket_key, {})
+        entry = bucket.get(key)
+        if entry is None:
+            entry = bucket[key] = [0.0, 0]
+        entry[1] += sign
+        if entry[1]:
+            entry[0] += sign * amount
+        else:
+            del bucket[key]
+            if not bucket:
+                del buckets[bucket_key]
+
+    def rebuild(self, days, type_codes, category_codes, amounts):
+        self.load_day_buckets(*group_buckets(days, type_codes, category_codes, amounts))
+
+    def load_day_buckets(self, days, type_codes, category_codes, amounts, counts):
+        # Takes the per-day table produced by group_buckets (one entry per day,
+        # type and category) and derives the month buckets from it.
+        self._days = {}
+        self._packed = (type_codes, category_codes, amounts, counts)
+        self._packed_days = _bucket_slices(days)
+        self._months = _bucket_dicts(*group_buckets(
+            months_of_days(days), type_codes, category_codes, amounts, counts
+        ))
+
+    def aggregate(self, start_day=None, end_day=None, category_code=None, with_counts=False):
+        # Sums keyed by (type code, category code); with_counts makes each
+        # value an [amount, row count] pair instead.
+        totals = {}
+        if not self._months:
+            return totals
+        if start_day is None:
+            start_day = first_day_of_month(min(self._months))
+        if end_day is None:
+            end_day = first_day_of_month(max(self._months) + 1) - 1
+        if start_day > end_day:
+            return totals
+
+        first_month = month_of_day(start_day)
+        last_month = month_of_day(end_day)
+        full_from = first_month if start_day == first_day_of_month(first_month) else first_month + 1
+        full_to = last_month if end_day == first_day_of_month(last_month + 1) - 1 else last_month - 1
+
+        if full_from > full_to:
+            self._sum_days(totals, start_day, end_day, category_code, with_counts)
+            return totals
+
+        self._sum_days(totals, start_day, first_day_of_month(full_from) - 1, category_code, with_counts)
+        for month in range(max(full_from, min(self._months)), min(full_to, max(self._months)) + 1):
+            self._sum_bucket(totals, self._months.get(month), category_code, with_counts)
+        self._sum_days(totals, first_day_of_month(full_to + 1), end_day, category_code, with_counts)
+        return totals
+
+    def _sum_days(self, totals, start_day, end_day, category_code, with_counts):
+        for day in range(start_day, end_day + 1):
+            if day in self._packed_days:
+                self._unpack_day(day)
+            self._sum_bucket(totals, self._days.get(day), category_code, with_counts)
+
+    def _sum_bucket(self, totals, bucket, category_code, with_counts):
+        if not bucket:
+            return
+        for key, (amount, count) in bucket.items():
+            if category_code is None or key[1] == category_code:
+                if with_counts:
+                    entry = totals.setdefault(key, [0.0, 0])
+                    entry[0] += amount
+                    entry[1] += count
+                else:
+                    totals[key] = totals.get(key, 0.0) + amount
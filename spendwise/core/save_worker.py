@@ -0,0 +1,170 @@
+import atexit
+import threading
+import time
+
+# Mutations arriving within this many seconds of each other share one write.
+SAVE_DEBOUNCE_SECONDS = 0.3
+# close() waits at most this long for the last write.
+CLOSE_TIMEOUT_SECONDS = 10.0
+
+
+# Persists mutation records on a background thread so the GUI thread never
+# waits on disk. Bursts of submit() calls are coalesced into one
+# write_batch(entries) call per debounce window. needs_compaction() is checked
+# after each write; compact() then runs on the same thread and returns the
+# highest sequence number it made durable.
+class SaveWorker:
+    def __init__(self, write_batch, compact, needs_compaction, debounce=SAVE_DEBOUNCE_SECONDS):
+        self._write_batch = write_batch
+        self._compact = compact
+        self._needs_compaction = needs_compaction
+        self._debounce = debounce
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._last_submit = 0.0
+        self._submitted_seq = 0
+        self._written_seq = 0
+        self._flush_requested = False
+        self._compaction_requested = False
+        self._compactions_done = 0
+        # Set while the last write attempt failed; cleared by the next success.
+        self._write_failed = False
+        self._stopping = False
+
+        self._thread = threading.Thread(target=self._run, name="SpendWiseSaveWorker", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, seq, entry):
+        with self._cond:
+            self._pending.append(entry)
+            self._submitted_seq = seq
+            self._last_submit = time.monotonic()
+            self._cond.notify_all()
+
+    def submit_many(self, seq, entries):
+        with self._cond:
+            self._pending.extend(entries)
+            self._submitted_seq = seq
+            self._last_submit = time.monotonic()
+            self._cond.notify_all()
+
+    def take_pending(self):
+        # Called by compact() while the owner holds its mutation lock, so the
+        # records returned are exactly those not yet covered by its snapshot.
+        with self._cond:
+            pending, self._pending = self._pending, []
+            return pending
+
+    def requeue(self, entries):
+        # Puts back records take_pending() returned that could not be written,
+        # ahead of anything submitted since, so the next write retries them.
+        with self._cond:
+            self._pending[:0] = entries
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        # Blocks until everything submitted so far is on disk. Returns False
+        # instead when a write fails (it is retried later) or on timeout.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted_seq
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._written_seq < target:
+                if not self._thread.is_alive() or self._write_failed:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def request_compaction(self):
+        # Like compact_now(), without waiting for it.
+        with self._cond:
+            self._compaction_requested = True
+            self._cond.notify_all()
+
+    def compact_now(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._compactions_done + 1
+            self._compaction_requested = True
+            self._cond.notify_all()
+            while self._compactions_done < target:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout=CLOSE_TIMEOUT_SECONDS):
+        # Writes what is pending, with one more attempt if writes have been
+        # failing, and stops the thread. Returns False if changes were not written.
+        atexit.unregister(self.close)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            # A compaction still running is fine; the journal already has everything.
+            return self._written_seq >= self._submitted_seq
+
+    def _wait_for_work(self):
+        with self._cond:
+            while True:
+                if self._compaction_requested or self._stopping:
+                    break
+                if self._pending:
+                    remaining = self._last_submit + self._debounce - time.monotonic()
+                    if self._flush_requested or remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._flush_requested = False
+                    self._cond.wait()
+            batch, self._pending = self._pending, []
+            compact = self._compaction_requested
+            self._compaction_requested = False
+            return batch, compact, self._submitted_seq
+
+    def _run(self):
+        while True:
+            batch, compact, seq = self._wait_for_work()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except (IOError, OSError) as e:
+                    with self._cond:
+                        self._pending[:0] = batch
+                        self._write_failed = True
+                        self._cond.notify_all()
+                        if self._stopping:
+                            print(f"Error writing pending changes: {e}. {len(batch)} changes were not saved.")
+                            return
+                    print(f"Error writing pending changes: {e}. Retrying.")
+                    time.sleep(self._debounce)
+                    continue
+                self._mark_written(seq)
+
+            if compact or self._needs_compaction():
+                durable_seq = self._compact()
+                with self._cond:
+                    self._compactions_done += 1
+                    if durable_seq is not None:
+                        self._written_seq = max(self._written_seq, durable_seq)
+                    self._cond.notify_all()
+
+            with self._cond:
+                if self._stopping and not self._pending:
+                    return
+
+    def _mark_written(self, seq):
+        with self._cond:
+            self._written_seq = max(self._written_seq, seq)
+            self._write_failed = False
+            self._cond.notify_all()
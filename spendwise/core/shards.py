@@ -0,0 +1,73 @@
+import datetime
+import json
+import os
+from spendwise.core.json_stream import JsonArrayReader
+from spendwise.core.parallel_load import map_pieces
+from spendwise.core.rollup import months_of_days
+from spendwise.core.transaction import JULIAN_ORDINAL_OFFSET, DayParser
+
+MANIFEST_VERSION = 1
+
+
+def year_of_day(day):
+    return datetime.date.fromordinal(day - JULIAN_ORDINAL_OFFSET).year
+
+
+def first_day_of_year(year):
+    return datetime.date(year, 1, 1).toordinal() + JULIAN_ORDINAL_OFFSET
+
+
+def years_of_days(days):
+    return sorted(set((months_of_days(days) // 12).tolist())) if len(days) else []
+
+
+def read_shard(path):
+    # Parses one shard file into (id, day, description, type, amount,
+    # category) tuples. Plain values only, so it can run in a worker process.
+    with open(path, encoding="utf-8") as f:
+        records = json.load(f)["transactions"]
+    day_parser = DayParser()
+    rows = []
+    for t_data in records:
+        try:
+            day = day_parser(t_data["date"])
+            if day is None:
+                print(f"Warning: Could not parse date '{t_data['date']}' for transaction ID {t_data.get('id')}. Skipping.")
+                continue
+            rows.append((t_data["id"], day, t_data["description"], t_data["type"],
+                         float(t_data["amount"]), t_data["category"]))
+        except KeyError as e:
+            print(f"Warning: Missing key {e} in transaction data: {t_data}. Skipping.")
+        except ValueError as e:
+            print(f"Warning: Value error parsing transaction data ({e}): {t_data}. Skipping.")
+    return rows
+
+
+def read_shards(paths, progress=None, max_workers=None):
+    # Yields read_shard() results in path order, in parallel for large loads.
+    sizes = [os.path.getsize(path) for path in paths]
+    return map_pieces(read_shard, [(path,) for path in paths], sizes, progress, max_workers)
+
+
+def iter_shard_records(paths):
+    # Streams snapshot records from each shard in turn, for faulting in
+    # history that was left unread at startup.
+    for path in paths:
+        yield from JsonArrayReader(path, "transactions")
+
+
+def shard_file_name(year, journal_seq):
+    # A new name per write, so the manifest never points at a half-written file.
+    return f"{year}.{journal_seq}.json"
+
+
+def remove_unreferenced_shards(shard_dir, manifest_name, shards):
+    referenced = {entry["file"] for entry in shards.values()}
+    referenced.add(manifest_name)
+    for name in os.listdir(shard_dir):
+        if name.endswith(".json") and name not in referenced:
+            try:
+                os.remove(os.path.join(shard_dir, name))
+            except OSError as e:
+                print(f"Warning: Could not remove outdated shard {name}: {e}")
+
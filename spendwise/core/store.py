@@ -0,0 +1,742 @@
+import math
+import numpy as np
+from PyQt5.QtCore import QDate
+from spendwise.core.transaction import Transaction, TYPES, CATEGORIES
+from spendwise.core.rollup import RollupCube, group_buckets, months_of_days
+from spendwise.core.query import group_result
+from spendwise.core.text_index import DescriptionIndex
+
+ROW_BITS = 32
+ROW_MASK = (1 << ROW_BITS) - 1
+
+
+def index_key(day, row):
+    return (int(day) << ROW_BITS) | int(row)
+
+
+# Sorted array of (day << 32 | row) keys. A date range is two bisections and a
+# slice, and rows come back in date order.
+class SortedIndex:
+    def __init__(self, keys=None):
+        self._keys = np.empty(0, dtype=np.int64) if keys is None else keys
+        self._size = len(self._keys)
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, key):
+        pos = int(np.searchsorted(self._keys[:self._size], key))
+        if self._size == len(self._keys):
+            grown = np.empty(max(64, 2 * self._size), dtype=np.int64)
+            grown[:pos] = self._keys[:pos]
+            grown[pos + 1:self._size + 1] = self._keys[pos:self._size]
+            self._keys = grown
+        else:
+            self._keys[pos + 1:self._size + 1] = self._keys[pos:self._size]
+        self._keys[pos] = key
+        self._size += 1
+
+    def remove(self, key):
+        pos = int(np.searchsorted(self._keys[:self._size], key))
+        if pos < self._size and self._keys[pos] == key:
+            self._keys[pos:self._size - 1] = self._keys[pos + 1:self._size]
+            self._size -= 1
+            return True
+        return False
+
+    def keys_between(self, start_day=None, end_day=None):
+        keys = self._keys[:self._size]
+        lo = 0 if start_day is None else int(np.searchsorted(keys, int(start_day) << ROW_BITS))
+        hi = self._size if end_day is None else int(np.searchsorted(keys, (int(end_day) + 1) << ROW_BITS))
+        return keys[lo:hi]
+
+    def rows_between(self, start_day=None, end_day=None):
+        return self.keys_between(start_day, end_day) & ROW_MASK
+
+
+def build_indexes(dates, category_codes, rows):
+    # Sorted date index keys for `rows`, plus one date-ordered posting list per
+    # category code as (code, keys) pairs in code order.
+    keys = np.sort((dates[rows].astype(np.int64) << ROW_BITS) | rows)
+    # Stable sort by category keeps each posting list in date order.
+    sorted_codes = category_codes[keys & ROW_MASK]
+    by_category = np.argsort(sorted_codes, kind="stable")
+    codes, starts = np.unique(sorted_codes[by_category], return_index=True)
+    bounds = list(starts[1:]) + [len(keys)]
+    return keys, [(int(code), keys[by_category[start:end]]) for code, start, end in zip(codes, starts, bounds)]
+
+
+# Column-oriented ledger: dates (Julian day numbers), amounts, type codes and
+# category codes live in NumPy arrays; ids and descriptions in side lists.
+# Transaction objects are only built for rows that are actually read.
+#
+# Rows never move during a session: deletes only clear the row's `alive` flag
+# and drop it from the indexes, so row numbers held by views stay valid.
+# compact() squeezes tombstones out and is only called right after a load.
+#
+# A store loaded with load_binary() starts out as views into a mapped
+# snapshot: ids resolve through the snapshot's sorted id table, with
+# _positions only recording ids changed since the load.
+class TransactionStore:
+    COLUMNS = ("_dates", "_amounts", "_type_codes", "_category_codes", "_alive")
+
+    def __init__(self, verify_totals=False):
+        # verify_totals is a debug aid: every read of the running totals is
+        # cross-checked against a full recompute.
+        self.verify_totals = verify_totals
+        # Set while the totals cover rows that have not been loaded yet (see
+        # load_day_totals()); a recompute from loaded rows would not match.
+        self.history_pending = False
+        self.types = TYPES
+        self.categories = CATEGORIES
+        self._size = 0
+        self._live = 0
+        self._dates = np.empty(0, dtype=np.int32)
+        self._amounts = np.empty(0, dtype=np.float64)
+        self._type_codes = np.empty(0, dtype=np.int8)
+        self._category_codes = np.empty(0, dtype=np.int16)
+        self._alive = np.empty(0, dtype=bool)
+        self._ids = []
+        self._descriptions = []
+        self._positions = {}
+        self._mapped = None
+        self._mapped_ids = None
+        self._date_index = SortedIndex()
+        self._category_index = {}
+        # Running sums and row counts keyed by (type code, category code).
+        self._totals = {}
+        self._counts = {}
+        # The same sums bucketed by day and month, for date-range aggregates.
+        self._rollup = RollupCube()
+        # Description search: the word index (built on the first search and
+        # kept up to date after that), a counter bumped by every change, and
+        # the last search, which a longer search text can narrow down.
+        self._text_index = None
+        self._generation = 0
+        self._last_search = None
+        # The ordered rows of the last row query, so that paging through it
+        # with limit() does not sort it again for every page.
+        self._last_rows = None
+
+    def __len__(self):
+        return self._live
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._dates):
+            return
+        capacity = max(capacity, 2 * len(self._dates), 64)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _write_row(self, row, transaction):
+        self._alive[row] = True
+        self._dates[row] = transaction.day
+        self._amounts[row] = transaction.amount
+        self._type_codes[row] = transaction.type_code
+        self._category_codes[row] = transaction.category_code
+
+    def _index_row(self, row):
+        self._generation += 1
+        if self._text_index is not None:
+            self._text_index.add(row, self._descriptions[row])
+        key = index_key(self._dates[row], row)
+        self._date_index.insert(key)
+        code = int(self._category_codes[row])
+        if code not in self._category_index:
+            self._category_index[code] = SortedIndex()
+        self._category_index[code].insert(key)
+        self._add_to_totals(row, 1)
+
+    def _unindex_row(self, row):
+        self._generation += 1
+        key = index_key(self._dates[row], row)
+        self._date_index.remove(key)
+        self._category_index[int(self._category_codes[row])].remove(key)
+        self._add_to_totals(row, -1)
+
+    def _add_to_totals(self, row, sign):
+        self._add_values_to_totals(
+            int(self._dates[row]), int(self._type_codes[row]), int(self._category_codes[row]),
+            float(self._amounts[row]), sign
+        )
+
+    def _add_values_to_totals(self, day, type_code, category_code, amount, sign):
+        key = (type_code, category_code)
+        self._rollup.add(day, type_code, category_code, amount, sign)
+        count = self._counts.get(key, 0) + sign
+        if count:
+            self._counts[key] = count
+            self._totals[key] = self._totals.get(key, 0.0) + sign * amount
+        else:
+            # Dropping emptied keys also resets any accumulated rounding error.
+            self._counts.pop(key, None)
+            self._totals.pop(key, None)
+
+    def _group_totals(self, type_codes, category_codes, amounts, counts=None):
+        _, type_codes, category_codes, sums, counts = group_buckets(
+            np.zeros(len(type_codes), dtype=np.int64), type_codes, category_codes, amounts, counts
+        )
+        keys = list(zip(type_codes.tolist(), category_codes.tolist()))
+        return dict(zip(keys, sums.tolist())), dict(zip(keys, counts.tolist()))
+
+    def _compute_totals(self, rows):
+        return self._group_totals(self._type_codes[rows], self._category_codes[rows], self._amounts[rows])
+
+    def rebuild_indexes(self, recompute_totals=True):
+        rows = self.live_rows()
+        keys, postings = build_indexes(self._dates, self._category_codes, rows)
+        self._date_index = SortedIndex(keys)
+        self._category_index = {code: SortedIndex(code_keys) for code, code_keys in postings}
+        if recompute_totals:
+            self._totals, self._counts = self._compute_totals(rows)
+            self._rollup.rebuild(self._dates[rows], self._type_codes[rows], self._category_codes[rows], self._amounts[rows])
+
+    def load_day_totals(self, days, type_codes, category_codes, amounts, counts):
+        # Seeds the running totals and rollup cube from a persisted per-day
+        # table (see day_buckets()) instead of from the rows themselves.
+        self._totals, self._counts = self._group_totals(type_codes, category_codes, amounts, counts)
+        self._rollup.load_day_buckets(days, type_codes, category_codes, amounts, counts)
+
+    def discount(self, transaction):
+        # Takes a row that was never loaded out of totals seeded by
+        # load_day_totals(), which still count it.
+        self._add_values_to_totals(transaction.day, transaction.type_code, transaction.category_code,
+                                   transaction.amount, -1)
+
+    def day_buckets(self):
+        rows = self.live_rows()
+        return group_buckets(self._dates[rows], self._type_codes[rows], self._category_codes[rows], self._amounts[rows])
+
+    def load_binary(self, snapshot):
+        # Columns and index keys stay views into the mapped file (copied only
+        # when they grow); ids and descriptions are decoded on access; totals
+        # come from the stored per-day table instead of a pass over the rows.
+        type_map = np.array([self.types.code(key) for key in snapshot.types], dtype=np.int8)
+        category_map = np.array([self.categories.code(key) for key in snapshot.categories], dtype=np.int16)
+
+        def remap(codes, code_map):
+            if np.array_equal(code_map, np.arange(len(code_map))):
+                return codes
+            return code_map[codes]
+
+        self._size = self._live = snapshot.rows
+        self._dates = snapshot.array("dates")
+        self._amounts = snapshot.array("amounts")
+        self._type_codes = remap(snapshot.array("type_codes"), type_map)
+        self._category_codes = remap(snapshot.array("category_codes"), category_map)
+        self._alive = np.ones(snapshot.rows, dtype=bool)
+        self._ids = snapshot.strings("id")
+        self._descriptions = snapshot.strings("description")
+        self._positions = {}
+        self._mapped = snapshot
+        self._mapped_ids = snapshot.id_index(self._ids)
+
+        self._date_index = SortedIndex(snapshot.array("date_keys"))
+        category_keys = snapshot.array("category_keys")
+        self._category_index = {
+            int(category_map[code]): SortedIndex(category_keys[start:end])
+            for code, start, end in snapshot.category_bounds
+        }
+
+        self.load_day_totals(
+            snapshot.array("bucket_days"),
+            remap(snapshot.array("bucket_types"), type_map),
+            remap(snapshot.array("bucket_categories"), category_map),
+            snapshot.array("bucket_amounts"),
+            snapshot.array("bucket_counts"),
+        )
+
+    def materialize(self):
+        # Copies everything still backed by a mapped snapshot into memory so
+        # the snapshot file can be closed and replaced.
+        if self._mapped is None:
+            return
+        for name in self.COLUMNS:
+            setattr(self, name, np.array(getattr(self, name)[:self._size]))
+        self._ids = self._ids[:self._size]
+        self._descriptions = self._descriptions[:self._size]
+        self._positions = {self._ids[row]: int(row) for row in self.live_rows()}
+        self._mapped_ids = None
+        self.rebuild_indexes()
+        snapshot, self._mapped = self._mapped, None
+        snapshot.close()
+
+    def close(self):
+        # Unmaps a loaded binary snapshot; the store must not be read afterwards.
+        if self._mapped is not None:
+            snapshot, self._mapped = self._mapped, None
+            snapshot.close()
+
+    def _forget_id(self, transaction_id):
+        if self._mapped_ids is not None:
+            # Ids in the mapped table can't be removed; shadow them instead.
+            self._positions[transaction_id] = -1
+        else:
+            del self._positions[transaction_id]
+
+    def append(self, transaction):
+        row = self._size
+        self._reserve(row + 1)
+        self._write_row(row, transaction)
+        self._ids.append(transaction.id)
+        self._descriptions.append(transaction.description)
+        self._positions[transaction.id] = row
+        self._size += 1
+        self._live += 1
+        self._index_row(row)
+        return row
+
+    def extend(self, transactions, reindex=True):
+        # Bulk loaders pass reindex=False per chunk and call rebuild_indexes() once.
+        transactions = list(transactions)
+        self.extend_columns(
+            [t.id for t in transactions], [t.day for t in transactions], [t.description for t in transactions],
+            [t.type_code for t in transactions], [t.amount for t in transactions],
+            [t.category_code for t in transactions], reindex
+        )
+
+    def extend_columns(self, ids, days, descriptions, type_codes, amounts, category_codes, reindex=True):
+        # Same as extend() for data that is already columnar; codes must come
+        # from this store's types and categories.
+        if not len(ids):
+            return
+        start = self._size
+        end = start + len(ids)
+        self._reserve(end)
+        self._dates[start:end] = days
+        self._amounts[start:end] = amounts
+        self._type_codes[start:end] = type_codes
+        self._category_codes[start:end] = category_codes
+        self._alive[start:end] = True
+        self._ids.extend(ids)
+        self._descriptions.extend(descriptions)
+        self._size = end
+        self._live += len(ids)
+        self._generation += 1
+        if self._text_index is not None:
+            for row in range(start, end):
+                self._text_index.add(row, self._descriptions[row])
+        if self._mapped_ids is None:
+            added = dict(zip(ids, range(start, end)))
+            if len(added) == len(ids) and not any(map(self._positions.__contains__, added)):
+                # No id repeats, the common case for loads and imports.
+                self._positions.update(added)
+                if reindex:
+                    self.rebuild_indexes()
+                return
+        for row, transaction_id in enumerate(ids, start):
+            previous = self.find(transaction_id)
+            if previous >= 0:
+                # Later duplicates of an id win, like a journal upsert would.
+                self._alive[previous] = False
+                self._live -= 1
+            self._positions[transaction_id] = row
+        if reindex:
+            self.rebuild_indexes()
+
+    def set_row(self, row, transaction):
+        self._unindex_row(row)
+        self._write_row(row, transaction)
+        if self._ids[row] != transaction.id:
+            self._forget_id(self._ids[row])
+            self._positions[transaction.id] = row
+        self._ids[row] = transaction.id
+        self._descriptions[row] = transaction.description
+        self._index_row(row)
+
+    def remove_row(self, row):
+        self._unindex_row(row)
+        self._alive[row] = False
+        self._forget_id(self._ids[row])
+        self._live -= 1
+
+    def find(self, transaction_id):
+        row = self._positions.get(transaction_id)
+        if row is None:
+            return self._mapped_ids.find(transaction_id) if self._mapped_ids is not None else -1
+        return row
+
+    def _take(self, rows, target):
+        for name in self.COLUMNS:
+            setattr(target, name, getattr(self, name)[rows])
+        if len(rows) == self._size:
+            target._ids = self._ids[:self._size]
+            target._descriptions = self._descriptions[:self._size]
+        else:
+            target._ids = [self._ids[i] for i in rows]
+            target._descriptions = [self._descriptions[i] for i in rows]
+        target._size = target._live = len(rows)
+
+    def compact(self):
+        # A mapped store keeps its tombstones until the next snapshot is
+        # written; squeezing them out would read every row.
+        if self._live == self._size or self._mapped is not None:
+            return
+        self._take(self.live_rows(), self)
+        # Row numbers change.
+        self._text_index = None
+        self._generation += 1
+        self._positions = {transaction_id: row for row, transaction_id in enumerate(self._ids)}
+        self.rebuild_indexes(recompute_totals=not self.history_pending)
+
+    def transaction(self, row):
+        return Transaction.from_codes(
+            self._ids[row], int(self._dates[row]), self._descriptions[row],
+            int(self._type_codes[row]), float(self._amounts[row]), int(self._category_codes[row])
+        )
+
+    def select(self, start_date=None, end_date=None, category=None):
+        # Rows come back in date order. A category narrows the search to its
+        # posting list, so a filtered range costs O(log n + k).
+        if category:
+            index = self._category_index.get(self.categories.lookup(category))
+            if index is None:
+                return np.empty(0, dtype=np.int64)
+        else:
+            index = self._date_index
+        start_day = start_date.toJulianDay() if start_date else None
+        end_day = end_date.toJulianDay() if end_date else None
+        return index.rows_between(start_day, end_day)
+
+    def day(self, row):
+        return int(self._dates[row])
+
+    def days(self, rows):
+        return self._dates[rows]
+
+    def live_days(self):
+        return self._dates[self.live_rows()]
+
+    def rows_newest_first(self):
+        rows = self.live_rows()
+        return rows[np.argsort(-self._dates[rows].astype(np.int64), kind="stable")]
+
+    def live_rows(self):
+        return np.flatnonzero(self._alive[:self._size])
+
+    def all_rows(self):
+        # Live rows in date order.
+        return self._date_index.rows_between()
+
+    def _codes(self, key_codes, keys):
+        # None when a query doesn't restrict the field, else the codes of
+        # those keys that exist.
+        if keys is None:
+            return None
+        return [code for code in map(key_codes.lookup, keys) if code >= 0]
+
+    def _candidate_keys(self, start_day, end_day, category_codes):
+        # Query planning: the date index gives the range in two bisections.
+        # With categories, their posting lists over the same range are never
+        # longer, but several have to be merged by sorting; when that sort
+        # would cost more than masking the date range, mask instead.
+        date_keys = self._date_index.keys_between(start_day, end_day)
+        if category_codes is None:
+            return date_keys
+        postings = [
+            self._category_index[code].keys_between(start_day, end_day)
+            for code in category_codes if code in self._category_index
+        ]
+        if len(postings) <= 1:
+            return postings[0] if postings else np.empty(0, dtype=np.int64)
+        merged = sum(len(keys) for keys in postings)
+        if merged * math.log2(max(merged, 2)) < len(date_keys):
+            return np.sort(np.concatenate(postings))
+        return date_keys[np.isin(self._category_codes[date_keys & ROW_MASK], category_codes)]
+
+    def matching_rows(self, query):
+        # Rows matching every predicate of query, in date order. Candidates
+        # come from the indexes; the other predicates are column masks,
+        # cheapest first, and the description test only sees what is left.
+        rows = self._candidate_keys(
+            query.start_day(), query.end_day(), self._codes(self.categories, query.categories)
+        ) & ROW_MASK
+        type_codes = self._codes(self.types, query.types)
+        if type_codes is not None:
+            rows = rows[np.isin(self._type_codes[rows], type_codes)]
+        if query.min_amount is not None:
+            rows = rows[self._amounts[rows] >= query.min_amount]
+        if query.max_amount is not None:
+            rows = rows[self._amounts[rows] <= query.max_amount]
+        if query.text:
+            rows = self._search(rows, query)
+        return rows
+
+    def _search(self, rows, query):
+        # Keeps the rows whose description contains query.text. When the last
+        # search had the same other predicates, nothing changed since, and its
+        # text is part of this one (the user kept typing), its matches are the
+        # starting point. The word index then narrows the rows, so only what
+        # it cannot decide is checked against the descriptions.
+        others = (query.start_day(), query.end_day(), query.types, query.categories, query.min_amount, query.max_amount)
+        last = self._last_search
+        if last is not None and last[0] == self._generation and last[1] == others and last[2] in query.text:
+            rows = last[3]
+        if self._text_index is None:
+            self._text_index = DescriptionIndex(self._descriptions, self.live_rows())
+        candidates, exact = self._text_index.candidates(query.text)
+        if candidates is not None:
+            rows = rows[np.isin(rows, candidates)]
+        if exact:
+            check = np.isin(rows, self._text_index.stale_rows())
+        else:
+            check = np.ones(len(rows), dtype=bool)
+        checked = np.flatnonzero(check)
+        if len(checked):
+            descriptions = self._descriptions
+            keep = np.ones(len(rows), dtype=bool)
+            keep[checked] = [query.text in descriptions[row].casefold() for row in rows[checked].tolist()]
+            rows = rows[keep]
+        self._last_search = (self._generation, others, query.text, rows)
+        return rows
+
+    def _key_ranks(self, key_codes):
+        # Code -> position of its key in alphabetical order.
+        ranks = np.zeros(len(key_codes), dtype=np.int64)
+        for rank, key in enumerate(sorted(key_codes.keys())):
+            code = key_codes.lookup(key)
+            if code >= 0:
+                ranks[code] = rank
+        return ranks
+
+    def order_rows(self, rows, field, descending=False):
+        # rows (in date order) sorted as Query.order_by() describes, in one
+        # vectorized pass except for descriptions. A stable sort keeps ties
+        # in date order; the date order itself needs no sort at all.
+        if field == "description":
+            descriptions = [self._descriptions[row].casefold() for row in rows.tolist()]
+            rows = rows[sorted(range(len(descriptions)), key=descriptions.__getitem__)]
+        elif field == "amount":
+            rows = rows[np.argsort(self._amounts[rows], kind="stable")]
+        elif field == "type":
+            rows = rows[np.argsort(self._key_ranks(self.types)[self._type_codes[rows]], kind="stable")]
+        elif field == "category":
+            rows = rows[np.argsort(self._key_ranks(self.categories)[self._category_codes[rows]], kind="stable")]
+        return rows[::-1] if descending else rows
+
+    def query_rows(self, query):
+        predicates = (
+            self._generation, query.start_day(), query.end_day(), query.types, query.categories,
+            query.min_amount, query.max_amount, query.text, query.order
+        )
+        last = self._last_rows
+        if last is not None and last[0] == predicates:
+            rows = last[1]
+        else:
+            rows = self.matching_rows(query)
+            if query.order is not None:
+                rows = self.order_rows(rows, *query.order)
+            self._last_rows = (predicates, rows)
+        start, stop = query.window(len(rows))
+        return rows[start:stop]
+
+    def query_groups(self, query):
+        fields = query.group_fields
+        if query.filters_rows() or not set(fields) <= {"type", "category"}:
+            keys, totals, counts = self._group_rows(self.matching_rows(query), fields)
+        else:
+            keys, totals, counts = self._group_totals_by(query, fields)
+            if self.verify_totals and not self.history_pending:
+                expected = self._group_rows(self.matching_rows(query), fields)
+                if keys != expected[0] or expected[2] != counts or any(
+                    not math.isclose(total, value, rel_tol=1e-9, abs_tol=1e-6) for total, value in zip(totals, expected[1])
+                ):
+                    print(f"Warning: Rollup totals drifted from a full recompute for {query}. Rebuilding them.")
+                    self.rebuild_indexes()
+                    keys, totals, counts = expected
+        start, stop = query.window(len(keys))
+        return group_result(keys[start:stop], totals[start:stop], counts[start:stop], fields)
+
+    def _group_totals_by(self, query, fields):
+        # Type and category groups straight from the running totals or the
+        # rollup cube, without visiting rows.
+        category_codes = self._codes(self.categories, query.categories)
+        type_codes = self._codes(self.types, query.types)
+        start_day, end_day = query.start_day(), query.end_day()
+        if start_day is None and end_day is None:
+            entries = {key: (amount, self._counts[key]) for key, amount in self._totals.items()}
+        else:
+            single = category_codes[0] if category_codes is not None and len(category_codes) == 1 else None
+            entries = self._rollup.aggregate(start_day, end_day, single, with_counts=True)
+        grouped = {}
+        for (type_code, category_code), (amount, count) in entries.items():
+            if (type_codes is not None and type_code not in type_codes) or \
+                    (category_codes is not None and category_code not in category_codes) or not count:
+                continue
+            key = tuple(
+                self.types.key(type_code) if field == "type" else self.categories.key(category_code)
+                for field in fields
+            )
+            entry = grouped.setdefault(key, [0.0, 0])
+            entry[0] += amount
+            entry[1] += count
+        keys = sorted(grouped)
+        return keys, [grouped[key][0] for key in keys], [grouped[key][1] for key in keys]
+
+    def _group_rows(self, rows, fields):
+        if not len(rows):
+            return [], [], []
+        columns = []
+        for field in fields:
+            if field == "type":
+                columns.append(self._type_codes[rows].astype(np.int64))
+            elif field == "category":
+                columns.append(self._category_codes[rows].astype(np.int64))
+            elif field == "year":
+                columns.append(months_of_days(self._dates[rows]) // 12)
+            elif field == "month":
+                columns.append(months_of_days(self._dates[rows]))
+            else:
+                columns.append(self._dates[rows].astype(np.int64))
+        if len(columns) == 1:
+            groups, inverse = np.unique(columns[0], return_inverse=True)
+            groups = groups[:, None]
+        else:
+            groups, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        totals = np.bincount(inverse, weights=self._amounts[rows], minlength=len(groups)).tolist()
+        counts = np.bincount(inverse, minlength=len(groups)).tolist()
+        keys = [tuple(self._group_value(field, value) for field, value in zip(fields, group))
+                for group in groups.tolist()]
+        # Codes don't sort like the keys they stand for.
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return [keys[i] for i in order], [totals[i] for i in order], [counts[i] for i in order]
+
+    def _group_value(self, field, value):
+        if field == "type":
+            return self.types.key(value)
+        if field == "category":
+            return self.categories.key(value)
+        if field == "year":
+            return f"{value:04d}"
+        if field == "month":
+            return f"{value // 12:04d}-{value % 12 + 1:02d}"
+        return QDate.fromJulianDay(value).toString("yyyy-MM-dd")
+
+    def field_records(self, rows, fields):
+        # Tuples of the given query fields (see query.QUERY_FIELDS) for rows.
+        row_list = rows.tolist()
+        columns = []
+        for field in fields:
+            if field == "id":
+                columns.append([self._ids[row] for row in row_list])
+            elif field == "description":
+                columns.append([self._descriptions[row] for row in row_list])
+            elif field == "day":
+                columns.append(self._dates[rows].tolist())
+            elif field == "date":
+                columns.append([QDate.fromJulianDay(day) for day in self._dates[rows].tolist()])
+            elif field == "amount":
+                columns.append(self._amounts[rows].tolist())
+            elif field == "type":
+                type_keys = self.types.keys()
+                columns.append([type_keys[code] for code in self._type_codes[rows].tolist()])
+            else:
+                category_keys = self.categories.keys()
+                columns.append([category_keys[code] for code in self._category_codes[rows].tolist()])
+        return list(zip(*columns))
+
+    def export_columns(self, rows=None):
+        if rows is None:
+            rows = self.live_rows()
+        return {
+            "dates": self._dates[rows],
+            "amounts": self._amounts[rows],
+            "type_codes": self._type_codes[rows],
+            "category_codes": self._category_codes[rows],
+            "ids": [self._ids[row] for row in rows.tolist()],
+            "descriptions": [self._descriptions[row] for row in rows.tolist()],
+        }
+
+    def records(self, rows):
+        # (id, day, description, type, amount, category) tuples for exporters.
+        type_keys = self.types.keys()
+        category_keys = self.categories.keys()
+        return [
+            (self._ids[row], day, self._descriptions[row], type_keys[type_code], amount, category_keys[category_code])
+            for row, day, type_code, amount, category_code in zip(
+                rows.tolist(), self._dates[rows].tolist(), self._type_codes[rows].tolist(),
+                self._amounts[rows].tolist(), self._category_codes[rows].tolist()
+            )
+        ]
+
+    def snapshot(self, rows=None):
+        # Independent, tombstone-free copy of rows (default: all live rows) for
+        # background serialization. Columns are memcpy'd; indexes are not
+        # needed to write a snapshot.
+        copy = TransactionStore()
+        self._take(self.live_rows() if rows is None else np.sort(rows), copy)
+        return copy
+
+    def iter_dicts(self, newest_first=False):
+        date_strings = {}
+        type_keys = self.types.keys()
+        category_keys = self.categories.keys()
+        rows = self.rows_newest_first() if newest_first else self.live_rows()
+        for row in rows:
+            day = int(self._dates[row])
+            date_text = date_strings.get(day)
+            if date_text is None:
+                date_text = date_strings[day] = QDate.fromJulianDay(day).toString("yyyy-MM-dd")
+            yield {
+                "id": self._ids[row],
+                "date": date_text,
+                "description": self._descriptions[row],
+                "type": type_keys[self._type_codes[row]],
+                "amount": float(self._amounts[row]),
+                "category": category_keys[self._category_codes[row]]
+            }
+
+
+# Read-only sequence over selected store rows that builds Transaction objects
+# on first access, so views only pay for the rows they display.
+class TransactionView:
+    def __init__(self, store, rows):
+        self._store = store
+        self._rows = rows
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._rows)))]
+        if index < 0:
+            index += len(self._rows)
+        transaction = self._cache.get(index)
+        if transaction is None:
+            transaction = self._cache[index] = self._store.transaction(int(self._rows[index]))
+        return transaction
+
+    def __iter__(self):
+        for i in range(len(self._rows)):
+            yield self[i]
+
+
+# Read-only sequence of projected tuples (see Query.select()) over selected
+# store rows, built a chunk at a time while iterating.
+class RecordView:
+    CHUNK_ROWS = 4096
+
+    def __init__(self, store, rows, fields):
+        self._store = store
+        self._rows = rows
+        self.fields = fields
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._store.field_records(self._rows[index], self.fields)
+        if index < 0:
+            index += len(self._rows)
+        return self._store.field_records(self._rows[index:index + 1], self.fields)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self._rows), self.CHUNK_ROWS):
+            yield from self._store.field_records(self._rows[start:start + self.CHUNK_ROWS], self.fields)
@@ -0,0 +1,254 @@
+import heapq
+import itertools
+import operator
+from bisect import bisect_left
+import numpy as np
+from PyQt5.QtCore import QDate
+
+# How many descriptions a lookup returns.
+SUGGESTION_LIMIT = 8
+# A transaction this many days older counts half as much towards the ranking.
+RECENCY_HALF_LIFE_DAYS = 90
+# Prefixes matching more descriptions than this keep a cached best list;
+# smaller ranges are ranked on the fly.
+SCAN_LIMIT = 128
+# Batches of at least this many records are counted with NumPy, and past
+# this many new or changed descriptions the sorted list and the cached best
+# lists are rebuilt rather than patched.
+BULK_INSERT_MIN = 64
+
+_EPOCH_DAY = QDate(2000, 1, 1).toJulianDay()
+_GROUP = operator.itemgetter(0, 2, 3)
+_DAY = operator.itemgetter(1)
+_LAST_CHAR = "\U0010ffff"
+
+
+def recency_weights(days):
+    # Exponential decay measured from a fixed epoch instead of from today:
+    # the ratio between two weights never changes, so rankings built from
+    # sums of them stay valid as time passes.
+    return np.exp2(np.clip((np.asarray(days, dtype=np.float64) - _EPOCH_DAY) / RECENCY_HALF_LIFE_DAYS, -1000, 1000))
+
+
+def recency_weight(day):
+    return float(recency_weights(day))
+
+
+def _last_of_groups(groups, days):
+    # For groups numbered 0..n-1, the position of each group's latest record
+    # (the later one on equal days).
+    order = np.lexsort((days, groups))
+    sorted_groups = groups[order]
+    return order[np.flatnonzero(np.concatenate((sorted_groups[1:] != sorted_groups[:-1], [True])))]
+
+
+# What has been recorded under one description (case-folded). text is the
+# spelling of its latest use; outcomes maps (type, category) to
+# [score, uses, latest day, amount on that day].
+class _Entry:
+    __slots__ = ("text", "day", "count", "outcomes")
+
+    def __init__(self, text):
+        self.text = text
+        self.day = None
+        self.count = 0
+        self.outcomes = {}
+
+
+# Autocomplete over past transaction descriptions, ranked by frequency and
+# recency (a sum of recency_weight() over each description's uses). The
+# case-folded descriptions are kept in one sorted list, so the matches of a
+# prefix are a bisected range. The best few of every range wider than
+# SCAN_LIMIT are cached per prefix and patched as transactions come and go;
+# narrower ranges are ranked directly.
+class DescriptionSuggester:
+    def __init__(self, limit=SUGGESTION_LIMIT):
+        self.limit = limit
+        self._entries = {}
+        self._scores = {}
+        self._keys = []
+        # prefix -> best keys, best first; None once a removal made it stale.
+        self._top = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_many(self, records):
+        # records are (description, day, type, category, amount) tuples.
+        records = list(records)
+        new_keys = []
+        if len(records) >= BULK_INSERT_MIN:
+            changed = self._record_bulk(records, new_keys)
+        else:
+            changed = set()
+            for record in records:
+                key = record[0].casefold()
+                if key not in self._entries:
+                    new_keys.append(key)
+                self._record(key, *record)
+                changed.add(key)
+        if len(new_keys) >= BULK_INSERT_MIN:
+            self._keys = sorted(self._keys + new_keys)
+        else:
+            for key in new_keys:
+                self._keys.insert(bisect_left(self._keys, key), key)
+        if len(changed) >= BULK_INSERT_MIN:
+            self._top = {}
+            # Fills every cached list now rather than on a keystroke.
+            self._collect("", 0, len(self._keys))
+        else:
+            for key in changed:
+                self._promote(key)
+
+    def add(self, description, day, type_key, category_key, amount):
+        self.add_many([(description, day, type_key, category_key, amount)])
+
+    def remove(self, description, day, type_key, category_key, amount):
+        # Takes back one add(); the amounts remembered for the description's
+        # other uses stay as they are.
+        key = description.casefold()
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        weight = recency_weight(day)
+        entry.count -= 1
+        outcome = entry.outcomes.get((type_key, category_key))
+        if outcome is not None:
+            outcome[0] -= weight
+            outcome[1] -= 1
+            if outcome[1] <= 0:
+                del entry.outcomes[(type_key, category_key)]
+        self._scores[key] = max(self._scores[key] - weight, 0.0)
+        if entry.count <= 0:
+            del self._entries[key]
+            del self._scores[key]
+            self._keys.pop(bisect_left(self._keys, key))
+        # Something else may outrank it now.
+        for end in range(len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is not None and key in top:
+                self._top[key[:end]] = None
+
+    def _record(self, key, description, day, type_key, category_key, amount):
+        weight = recency_weight(day)
+        self._merge(key, description, day, weight, 1)
+        self._merge_outcome(key, (type_key, category_key), day, amount, weight, 1)
+
+    def _record_bulk(self, records, new_keys):
+        # Same as _record() for every record, with the sums and latest uses
+        # computed in NumPy. Records are first grouped by (description, type,
+        # category) without a Python-level loop; only the distinct groups
+        # are then visited.
+        first_seen = {}
+        first_of = np.fromiter(
+            map(first_seen.setdefault, map(_GROUP, records), itertools.count()), dtype=np.int64, count=len(records)
+        )
+        firsts, group_of = np.unique(first_of, return_inverse=True)
+        group_of = group_of.reshape(-1)
+        day_column = np.fromiter(map(_DAY, records), dtype=np.int64, count=len(records))
+        weights = recency_weights(day_column)
+        key_ids = {}
+        key_of_group = np.fromiter(
+            (key_ids.setdefault(records[row][0].casefold(), len(key_ids)) for row in firsts.tolist()),
+            dtype=np.int64, count=len(firsts)
+        )
+        key_of = key_of_group[group_of]
+        keys = list(key_ids)
+        for key, row, score, count in zip(
+            keys, _last_of_groups(key_of, day_column).tolist(),
+            np.bincount(key_of, weights, len(keys)).tolist(), np.bincount(key_of, minlength=len(keys)).tolist()
+        ):
+            if key not in self._entries:
+                new_keys.append(key)
+            self._merge(key, records[row][0], records[row][1], score, count)
+        for key_id, row, score, count in zip(
+            key_of_group.tolist(), _last_of_groups(group_of, day_column).tolist(),
+            np.bincount(group_of, weights, len(firsts)).tolist(), np.bincount(group_of, minlength=len(firsts)).tolist()
+        ):
+            _, day, type_key, category_key, amount = records[row]
+            self._merge_outcome(keys[key_id], (type_key, category_key), day, amount, score, count)
+        return keys
+
+    def _merge(self, key, description, day, score, count):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(description)
+            self._scores[key] = 0.0
+        self._scores[key] += score
+        entry.count += count
+        if entry.day is None or day >= entry.day:
+            entry.day = day
+            entry.text = description
+
+    def _merge_outcome(self, key, outcome_key, day, amount, score, count):
+        outcomes = self._entries[key].outcomes
+        outcome = outcomes.get(outcome_key)
+        if outcome is None:
+            outcomes[outcome_key] = [score, count, day, amount]
+        else:
+            outcome[0] += score
+            outcome[1] += count
+            if day >= outcome[2]:
+                outcome[2] = day
+                outcome[3] = amount
+
+    def _promote(self, key):
+        # key's score went up: move it up (or into) every cached list. In a
+        # batch, other keys of a list may have gone up too and not been
+        # re-sorted yet, so its last key need not be its lowest.
+        score = self._scores[key]
+        for end in range(len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is None:
+                continue
+            if key in top:
+                top.sort(key=self._scores.__getitem__, reverse=True)
+            elif len(top) < self.limit or score > min(map(self._scores.__getitem__, top)):
+                top.append(key)
+                top.sort(key=self._scores.__getitem__, reverse=True)
+                del top[self.limit:]
+
+    def _best(self, keys):
+        return heapq.nlargest(self.limit, keys, key=self._scores.__getitem__)
+
+    def _collect(self, prefix, lo, hi):
+        # Best keys of keys[lo:hi], which all start with prefix. Wide ranges
+        # are merged from their one-character-longer prefixes and cached.
+        keys = self._keys
+        if hi - lo <= SCAN_LIMIT:
+            return self._best(keys[lo:hi])
+        depth = len(prefix) + 1
+        candidates = []
+        if keys[lo] == prefix:
+            candidates.append(prefix)
+            lo += 1
+        while lo < hi:
+            child = keys[lo][:depth]
+            end = bisect_left(keys, child + _LAST_CHAR, lo, hi)
+            top = self._top.get(child)
+            candidates.extend(top if top is not None else self._collect(child, lo, end))
+            lo = end
+        top = self._top[prefix] = self._best(candidates)
+        return top
+
+    def suggest(self, text):
+        # Up to limit past descriptions starting with text (ignoring case),
+        # best first, each in its latest spelling.
+        prefix = text.casefold()
+        if not prefix:
+            return []
+        top = self._top.get(prefix)
+        if top is None:
+            lo = bisect_left(self._keys, prefix)
+            top = self._collect(prefix, lo, bisect_left(self._keys, prefix + _LAST_CHAR, lo))
+        return [self._entries[key].text for key in top]
+
+    def guess(self, description):
+        # (type, category, amount) the description most likely goes with:
+        # its best-ranked type and category, and the latest amount used with
+        # them. None for an unknown description.
+        entry = self._entries.get(description.casefold())
+        if entry is None or not entry.outcomes:
+            return None
+        (type_key, category_key), (_, _, _, amount) = max(entry.outcomes.items(), key=lambda item: item[1][0])
+        return type_key, category_key, amount
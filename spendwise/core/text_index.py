@@ -0,0 +1,125 @@
+import re
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+def _sorted_unique(values):
+    # np.unique, but much faster than its hashing path for large int arrays.
+    values = np.sort(values)
+    if len(values) > 1:
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def words(text):
+    # Case-folded runs of word characters. A word of a search text always
+    # lies inside one word of any description containing that text.
+    return _WORD.findall(text.casefold())
+
+
+# Inverted index from description words to store rows, for substring search.
+# Words are kept in a vocabulary; the rows of each word sit in one sorted
+# postings array (offsets[word id] to offsets[word id + 1]), so rows for many
+# words are gathered in one vectorized step. A search word is looked up by
+# scanning the vocabulary (joined into one string) for it, which finds it
+# inside longer words too.
+#
+# Rows added or edited after the build go to a small per-word overflow.
+# Postings of a row's old description are left in place: deleted rows drop
+# out when matched against the live date index, and edited ("stale") rows
+# are re-checked against their current description.
+class DescriptionIndex:
+    def __init__(self, descriptions, rows):
+        self._word_ids = {}
+        self._vocabulary = []
+        word_column = []
+        row_column = []
+        for row in rows.tolist():
+            for word in set(words(descriptions[row])):
+                word_id = self._word_ids.get(word)
+                if word_id is None:
+                    word_id = self._word_ids[word] = len(self._vocabulary)
+                    self._vocabulary.append(word)
+                word_column.append(word_id)
+                row_column.append(row)
+        word_column = np.array(word_column, dtype=np.int64)
+        # Stable, so each word's rows stay ascending.
+        self._postings = np.array(row_column, dtype=np.int64)[np.argsort(word_column, kind="stable")]
+        self._offsets = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(word_column, minlength=len(self._vocabulary)), out=self._offsets[1:])
+        self._base_words = len(self._vocabulary)
+        self._base_rows = int(rows.max()) + 1 if len(rows) else 0
+        self._overflow = {}
+        self._overflow_rows = set()
+        self._stale = set()
+        self._joined = None
+        self._word_starts = None
+
+    def add(self, row, description):
+        if row < self._base_rows or row in self._overflow_rows:
+            self._stale.add(row)
+        self._overflow_rows.add(row)
+        for word in set(words(description)):
+            word_id = self._word_ids.get(word)
+            if word_id is None:
+                word_id = self._word_ids[word] = len(self._vocabulary)
+                self._vocabulary.append(word)
+                self._joined = None
+            self._overflow.setdefault(word_id, []).append(row)
+
+    def _words_containing(self, word, starts=False, ends=False):
+        # Ids of the vocabulary words containing word, optionally only those
+        # starting or ending with it.
+        if self._joined is None:
+            self._joined = "\n".join(self._vocabulary)
+            lengths = np.fromiter(map(len, self._vocabulary), dtype=np.int64, count=len(self._vocabulary))
+            self._word_starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        positions = np.fromiter(
+            (match.start() for match in re.finditer(
+                ("^" if starts else "") + re.escape(word) + ("$" if ends else ""), self._joined, re.MULTILINE
+            )), dtype=np.int64
+        )
+        # Positions come in order, so the word ids do too.
+        word_ids = np.searchsorted(self._word_starts, positions, side="right") - 1
+        return word_ids[np.concatenate(([True], word_ids[1:] != word_ids[:-1]))] if len(word_ids) else word_ids
+
+    def _rows_for(self, word, starts=False, ends=False):
+        word_ids = self._words_containing(word, starts, ends)
+        base_ids = word_ids[word_ids < self._base_words]
+        starts = self._offsets[base_ids]
+        lengths = self._offsets[base_ids + 1] - starts
+        # Gathers every [start, start + length) range at once.
+        gather = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        rows = self._postings[gather]
+        overflow = [self._overflow[word_id] for word_id in word_ids.tolist() if word_id in self._overflow]
+        if overflow:
+            rows = np.concatenate([rows] + [np.array(extra, dtype=np.int64) for extra in overflow])
+        elif len(base_ids) == 1:
+            # A single postings run is already sorted and unique.
+            return rows
+        return _sorted_unique(rows)
+
+    def candidates(self, text):
+        # (rows, exact) for a case-folded search text. rows is a sorted
+        # superset of the rows containing text, or None when text has no
+        # word to look up. exact means only stale rows need re-checking:
+        # text is a single word, so containing it is the same as one of the
+        # description's words containing it. A search word with more text
+        # before it has to start a description word, one with more text after
+        # it has to end one.
+        lookups = {
+            (match.group(), match.start() > 0, match.end() < len(text)) for match in _WORD.finditer(text)
+        }
+        if not lookups:
+            return None, False
+        rows = None
+        for word, starts, ends in sorted(lookups, key=lambda lookup: len(lookup[0]), reverse=True):
+            word_rows = self._rows_for(word, starts, ends)
+            rows = word_rows if rows is None else np.intersect1d(rows, word_rows, assume_unique=True)
+            if not len(rows):
+                break
+        return rows, lookups == {(text, False, False)}
+
+    def stale_rows(self):
+        return np.array(sorted(self._stale), dtype=np.int64)
@@ -1,12 +1,184 @@
+import datetime
+from PyQt5.QtCore import QDate, Qt
 
-from dataclasses import dataclass
-from PyQt5.QtCore import QDate
+# QDate.toJulianDay() of 0001-01-01 is one more than this; date.toordinal() counts from 1.
+JULIAN_ORDINAL_OFFSET = 1721425
 
-@dataclass
+# Interns short repeated strings (types, category keys) as small integer codes.
+class KeyCodes:
+    def __init__(self, keys=()):
+        self._keys = []
+        self._codes = {}
+        for key in keys:
+            self.code(key)
+
+    def code(self, key):
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self._keys)
+            self._codes[key] = code
+            self._keys.append(key)
+        return code
+
+    def lookup(self, key):
+        return self._codes.get(key, -1)
+
+    def key(self, code):
+        return self._keys[code]
+
+    def keys(self):
+        return list(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+TYPES = KeyCodes(("income", "expense"))
+CATEGORIES = KeyCodes()
+
+
+# Compact record: the date is kept as a Julian day number and only turned into
+# a QDate when read, and type/category are shared integer codes.
 class Transaction:
-    id: str 
-    date: QDate
-    description: str
-    type: str 
-    amount: float
-    category: str
+    __slots__ = ("id", "day", "description", "type_code", "amount", "category_code")
+
+    def __init__(self, id, date, description, type, amount, category):
+        self.id = id
+        self.day = date.toJulianDay()
+        self.description = description
+        self.type_code = TYPES.code(type)
+        self.amount = amount
+        self.category_code = CATEGORIES.code(category)
+
+    @classmethod
+    def from_codes(cls, id, day, description, type_code, amount, category_code):
+        t = cls.__new__(cls)
+        t.id = id
+        t.day = day
+        t.description = description
+        t.type_code = type_code
+        t.amount = amount
+        t.category_code = category_code
+        return t
+
+    @property
+    def date(self):
+        return QDate.fromJulianDay(self.day)
+
+    @date.setter
+    def date(self, value):
+        self.day = value.toJulianDay()
+
+    @property
+    def type(self):
+        return TYPES.key(self.type_code)
+
+    @type.setter
+    def type(self, value):
+        self.type_code = TYPES.code(value)
+
+    @property
+    def category(self):
+        return CATEGORIES.key(self.category_code)
+
+    @category.setter
+    def category(self, value):
+        self.category_code = CATEGORIES.code(value)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.id, self.day, self.description, self.type_code, self.amount, self.category_code) == \
+            (other.id, other.day, other.description, other.type_code, other.amount, other.category_code)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Transaction(id={self.id!r}, date={self.date!r}, description={self.description!r}, "
+                f"type={self.type!r}, amount={self.amount!r}, category={self.category!r})")
+
+
+def parse_date(date_text):
+    date_obj = QDate.fromString(date_text, "yyyy-MM-dd")
+    if not date_obj.isValid():
+        date_obj = QDate.fromString(date_text, Qt.ISODate)
+    return date_obj
+
+
+def parse_day(date_text):
+    # Julian day number of an ISO date, or None if it does not parse. Plain
+    # yyyy-MM-dd strings skip Qt entirely; anything else goes through parse_date.
+    if isinstance(date_text, str) and len(date_text) == 10 and date_text[4] == "-" and date_text[7] == "-":
+        try:
+            return datetime.date.fromisoformat(date_text).toordinal() + JULIAN_ORDINAL_OFFSET
+        except ValueError:
+            pass
+    date_obj = parse_date(date_text)
+    return date_obj.toJulianDay() if date_obj.isValid() else None
+
+
+# Memoizing parse_day for bulk loads: ledgers have far fewer distinct dates
+# than rows, so each date string is only decoded once.
+class DayParser:
+    def __init__(self):
+        self._days = {}
+
+    def __call__(self, date_text):
+        try:
+            return self._days[date_text]
+        except KeyError:
+            day = self._days[date_text] = parse_day(date_text)
+            return day
+
+
+def transaction_from_dict(t_data, day_parser=None):
+    # Bulk loaders pass a shared DayParser; single records use Qt's parser.
+    try:
+        if day_parser is not None:
+            day = day_parser(t_data["date"])
+            if day is None:
+                print(f"Warning: Could not parse date '{t_data['date']}' for transaction ID {t_data.get('id')}. Skipping.")
+                return None
+            return Transaction.from_codes(
+                t_data["id"], day, t_data["description"], TYPES.code(t_data["type"]),
+                float(t_data["amount"]), CATEGORIES.code(t_data["category"])
+            )
+
+        date_obj = parse_date(t_data["date"])
+        if not date_obj.isValid():
+            print(f"Warning: Could not parse date '{t_data['date']}' for transaction ID {t_data.get('id')}. Skipping.")
+            return None
+
+        return Transaction(
+            id=t_data["id"],
+            date=date_obj,
+            description=t_data["description"],
+            type=t_data["type"],
+            amount=float(t_data["amount"]),
+            category=t_data["category"]
+        )
+    except KeyError as e:
+        print(f"Warning: Missing key {e} in transaction data: {t_data}. Skipping.")
+    except ValueError as e:
+        print(f"Warning: Value error parsing transaction data ({e}): {t_data}. Skipping.")
+    return None
+
+
+def transaction_from_row(row):
+    # (id, day, description, type, amount, category) tuples, as produced by
+    # the importers, shard readers and compressed snapshots.
+    transaction_id, day, description, type_key, amount, category_key = row
+    return Transaction.from_codes(
+        transaction_id, day, description, TYPES.code(type_key), amount, CATEGORIES.code(category_key)
+    )
+
+
+def transaction_to_dict(t):
+    return {
+        "id": t.id,
+        "date": t.date.toString("yyyy-MM-dd"),
+        "description": t.description,
+        "type": t.type,
+        "amount": t.amount,
+        "category": t.category
+    }
@@ -15,6 +15,7 @@ if _project_root not in sys.path:
 
 from spendwise.main_window import MainWindow
 from spendwise.core.data_manager import DataManager
+from spendwise.core.json_stream import LoadCancelled
 from spendwise.utils.translator import Translator
 from spendwise.utils.theme_manager import ThemeManager
 from spendwise.widgets.splash_screen import SplashScreen
@@ -86,7 +87,15 @@ def main():
 
     app.setLayoutDirection(Qt.RightToLeft if initial_lang == "ar" else Qt.LeftToRight)
 
-    data_manager = DataManager(settings, app.translator)
+    loading_message = translator.translate("loading_data_status", "Loading data...")
+    try:
+        data_manager = DataManager(
+            settings, app.translator,
+            progress_callback=lambda done, total: splash.show_progress(done, total, loading_message)
+        )
+    except LoadCancelled:
+        print("Loading cancelled. Exiting.")
+        sys.exit(0)
     app.data_manager = data_manager
 
     main_window = MainWindow()
@@ -96,6 +105,7 @@ def main():
         lambda lang: app.setLayoutDirection(Qt.RightToLeft if lang == "ar" else Qt.LeftToRight)
     )
     app.currency_changed.connect(main_window.on_currency_changed)
+    data_manager.external_changes_applied.connect(main_window.on_external_changes)
 
     QTimer.singleShot(1500, lambda: show_main_window(splash, main_window))
 
@@ -1,14 +1,17 @@
 
+import csv
 import uuid
 import base64
 import os # For checking logo path in show_about_dialog
+import numpy as np
+from concurrent.futures.process import BrokenProcessPool
 from PyQt5.QtWidgets import (
     QMainWindow, QAction, QTableView, QVBoxLayout, QHBoxLayout, QWidget,
     QToolBar, QLabel, QComboBox, QDateEdit, QPushButton, QMessageBox,
     QAbstractItemView, QHeaderView, QMenu, QApplication, QSplitter, QGroupBox,
-    QStyle, QActionGroup, QSizePolicy, QInputDialog, QLineEdit
+    QStyle, QActionGroup, QSizePolicy, QInputDialog, QLineEdit, QFileDialog
 )
-from PyQt5.QtCore import Qt, QDate, QAbstractTableModel, QVariant, pyqtSignal, QModelIndex, QSortFilterProxyModel, QSettings, QPropertyAnimation, QEasingCurve, QSize
+from PyQt5.QtCore import Qt, QDate, QAbstractTableModel, QVariant, pyqtSignal, QModelIndex, QSettings, QPropertyAnimation, QEasingCurve, QSize, QTimer
 from PyQt5.QtGui import QIcon, QPixmap, QPainter # QPainter for fallback logo
 
 from spendwise.widgets.transaction_dialog import TransactionDialog
@@ -16,8 +19,41 @@ from spendwise.widgets.statistics_dialog import StatisticsDialog
 from spendwise.widgets.about_dialog import AboutDialog
 from spendwise.widgets.chart_widget import SpendChartWidget
 from spendwise.core.transaction import Transaction
+from spendwise.core.changes import ChangeSet
+from spendwise.core.query import Query
 from resources import images
 
+# Past this many separate blocks of inserted, removed or moved rows, a plain
+# model reset is cheaper than signalling each block.
+MAX_ROW_CHANGE_RUNS = 64
+# The search box re-queries once typing pauses for this long.
+SEARCH_DEBOUNCE_MS = 150
+# Formatted cell texts kept per column before that column's cache starts over
+# (amounts are the only column with this many distinct values).
+DISPLAY_CACHE_LIMIT = 65536
+# Rows the table reads from its query at a time.
+PAGE_ROWS = 256
+
+
+def _row_runs(positions):
+    # Ascending positions -> [(first, last)] blocks of consecutive rows.
+    if not len(positions):
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(positions) - 1]))
+    return list(zip(positions[starts].tolist(), positions[ends].tolist()))
+
+def _match_keys(old_data, new_data, updated_ids):
+    # Integer codes of the ids of both sides and of the updated rows, so the
+    # sides can be compared with vectorized set operations.
+    codes = {}
+    old_keys, new_keys = (
+        np.fromiter((codes.setdefault(t.id, len(codes)) for t in data), dtype=np.int64, count=len(data))
+        for data in (old_data, new_data)
+    )
+    return old_keys, new_keys, np.array([codes[i] for i in updated_ids if i in codes], dtype=np.int64)
+
 class TransactionTableModel(QAbstractTableModel):
     def __init__(self, data, headers, parent=None):
         super().__init__(parent)
@@ -25,6 +61,19 @@ class TransactionTableModel(QAbstractTableModel):
         self._headers = headers
         self.translator = QApplication.instance().translator
         self.data_manager = QApplication.instance().data_manager
+        # Column -> {date day, amount, type or category key: display text}.
+        # The texts only depend on the language, the currency symbol and the
+        # layout direction, so they are dropped when one of those changes.
+        self._display_cache = None
+        self.translator.language_changed.connect(self.clear_display_cache)
+        QApplication.instance().currency_changed.connect(self.clear_display_cache)
+        QApplication.instance().layoutDirectionChanged.connect(self.clear_display_cache)
+        # _data holds the rows read so far from the query's cursor; the
+        # query sorts them (see sort()).
+        self._query = None
+        self._cursor = None
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
 
     def rowCount(self, parent=QModelIndex()):
         return len(self._data)
@@ -32,6 +81,44 @@ class TransactionTableModel(QAbstractTableModel):
     def columnCount(self, parent=QModelIndex()):
         return len(self._headers)
 
+    def clear_display_cache(self, *args):
+        # The settings are read again on the next data() call, after every
+        # handler of the change (including setLayoutDirection) has run.
+        self._display_cache = None
+
+    def _display_texts(self, column_key):
+        if self._display_cache is None:
+            self._date_format = self.translator.translate("date_format_short", "yyyy-MM-dd")
+            self._currency_symbol = self.data_manager.get_display_currency_symbol()
+            self._right_to_left = QApplication.instance().layoutDirection() == Qt.RightToLeft
+            self._display_cache = {}
+        texts = self._display_cache.get(column_key)
+        if texts is None or len(texts) >= DISPLAY_CACHE_LIMIT:
+            texts = self._display_cache[column_key] = {}
+        return texts
+
+    def _display_text(self, transaction, column_key):
+        if column_key == "date":
+            value = transaction.day
+        elif column_key == "amount":
+            value = transaction.amount
+        else:
+            value = getattr(transaction, column_key)
+        texts = self._display_texts(column_key)
+        text = texts.get(value)
+        if text is None:
+            if column_key == "date":
+                text = transaction.date.toString(self._date_format)
+            elif column_key == "amount":
+                if self._right_to_left:
+                    text = f"{value:.2f} {self._currency_symbol}"
+                else:
+                    text = f"{self._currency_symbol}{value:.2f}" # No space for typical LTR
+            else:
+                text = self.translator.translate(value)
+            texts[value] = text
+        return text
+
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return QVariant()
@@ -40,19 +127,10 @@ class TransactionTableModel(QAbstractTableModel):
         column_key = self._headers[index.column()] 
 
         if role == Qt.DisplayRole:
-            if column_key == "date":
-                return transaction.date.toString(self.translator.translate("date_format_short", "yyyy-MM-dd"))
-            elif column_key == "description":
+            if column_key == "description":
                 return transaction.description
-            elif column_key == "type":
-                return self.translator.translate(transaction.type) 
-            elif column_key == "amount":
-                currency_symbol = self.data_manager.get_display_currency_symbol()
-                if QApplication.instance().layoutDirection() == Qt.RightToLeft:
-                     return f"{transaction.amount:.2f} {currency_symbol}"
-                return f"{currency_symbol}{transaction.amount:.2f}" # No space for typical LTR
-            elif column_key == "category":
-                return self.translator.translate(transaction.category) 
+            elif column_key in ("date", "type", "amount", "category"):
+                return self._display_text(transaction, column_key)
         elif role == Qt.TextAlignmentRole:
             if column_key == "amount":
                 return Qt.AlignRight | Qt.AlignVCenter
@@ -63,11 +141,147 @@ class TransactionTableModel(QAbstractTableModel):
             return self.translator.translate(self._headers[section])
         return QVariant()
 
+    def set_query(self, query):
+        # Shows the rows of a row query (a query.Query without select() or
+        # group_by()), read a page at a time as the view scrolls down (see
+        # fetchMore()), so only the rows looked at are ever built.
+        self._query = query
+        self.beginResetModel()
+        self._cursor = self.data_manager.open_cursor(self._ordered(query))
+        self._data = self._cursor.fetch(PAGE_ROWS)
+        self.endResetModel()
+
+    def _ordered(self, query):
+        if self._sort_column is None:
+            return query
+        # Types and categories sort by their stored keys, so the order is the
+        # same whatever language the UI is in.
+        return query.order_by(self._headers[self._sort_column], self._sort_order == Qt.DescendingOrder)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._cursor is not None and not self._cursor.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        page = self._cursor.fetch(PAGE_ROWS)
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._data), len(self._data) + len(page) - 1)
+            self._data.extend(page)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # Called by the view when a header is clicked. The query does the
+        # sorting, and the table starts over from its first page.
+        self._sort_column = column
+        self._sort_order = order
+        if self._query is not None:
+            self.set_query(self._query)
+
+    def reload(self, updated_ids=()):
+        # Runs the query again after the ledger changed. Only the ids of the
+        # rows read so far (or of all rows once the cursor has reached the
+        # end) are compared; Transactions are read again just for the stretch
+        # between the first and the last difference, and apply_view() signals
+        # that stretch.
+        if self._query is None:
+            return
+        query = self._ordered(self._query)
+        count = None if self._cursor.exhausted else max(len(self._data), PAGE_ROWS)
+        new_ids = [record[0] for record in self.data_manager.query(query.select("id").limit(count))]
+        old_ids = [t.id for t in self._data]
+        updated = set(updated_ids)
+        common = min(len(old_ids), len(new_ids))
+        first = 0
+        while first < common and old_ids[first] == new_ids[first] and old_ids[first] not in updated:
+            first += 1
+        tail = 0
+        while tail < common - first and old_ids[-1 - tail] == new_ids[-1 - tail] and old_ids[-1 - tail] not in updated:
+            tail += 1
+        stop = len(old_ids) - tail
+        # Rows that only shifted keep their Transactions; the few new or
+        # edited ones are looked up by id.
+        known = {t.id: t for t in self._data[first:stop] if t.id not in updated}
+        window_ids = new_ids[first:len(new_ids) - tail]
+        missing = [transaction_id for transaction_id in window_ids if transaction_id not in known]
+        if len(missing) > PAGE_ROWS:
+            rows = list(self.data_manager.query(query.limit(len(window_ids), first)))
+        else:
+            known.update((t.id, t) for t in map(self.data_manager.get_transaction_by_id, missing))
+            rows = [known[transaction_id] for transaction_id in window_ids]
+        cursor = self.data_manager.open_cursor(query, len(new_ids))
+        cursor.exhausted = count is None or len(new_ids) < count
+        self._cursor = cursor
+        self.apply_view(rows, updated_ids, first, stop)
+
     def refresh_data(self, new_data):
         self.beginResetModel()
         self._data = new_data
         self.endResetModel()
 
+    def apply_view(self, new_rows, updated_ids=(), start=0, stop=None):
+        # Replaces the rows from start to stop (the end for None) with
+        # new_rows through row removals, moves and insertions, plus
+        # dataChanged for rows edited in place (updated_ids), instead of a
+        # reset, so the table keeps its scroll position and the selection
+        # stays on the same transactions. Rows are matched by id.
+        stop = len(self._data) if stop is None else stop
+        old_rows = self._data[start:stop]
+        new_data = self._data[:start] + new_rows + self._data[stop:]
+        old_keys, new_keys, updated_keys = _match_keys(old_rows, new_rows, updated_ids)
+        kept = np.isin(old_keys, new_keys, assume_unique=True)
+        shown = np.isin(new_keys, old_keys, assume_unique=True)
+        moved_keys = np.empty(0, dtype=np.int64)
+        if not np.array_equal(old_keys[kept], new_keys[shown]):
+            # An edit moved rows past others (a new date, or a new amount
+            # under an amount sort); the others must still be in order.
+            old_staying = old_keys[kept]
+            new_staying = new_keys[shown]
+            old_staying = old_staying[~np.isin(old_staying, updated_keys)]
+            new_staying = new_staying[~np.isin(new_staying, updated_keys)]
+            if not np.array_equal(old_staying, new_staying):
+                self.refresh_data(new_data)
+                return
+            moved_keys = np.intersect1d(updated_keys, old_keys[kept])
+        removed_runs = _row_runs(np.flatnonzero(~kept))
+        inserted_runs = _row_runs(np.flatnonzero(~shown))
+        if len(removed_runs) + len(inserted_runs) + len(moved_keys) > MAX_ROW_CHANGE_RUNS:
+            self.refresh_data(new_data)
+            return
+        # Removals go from the bottom up and insertions top down, so each
+        # block's row numbers are still valid when it is signalled.
+        rows = self._data = list(self._data)
+        for first, last in reversed(removed_runs):
+            self.beginRemoveRows(QModelIndex(), start + first, start + last)
+            del rows[start + first:start + last + 1]
+            self.endRemoveRows()
+        if len(moved_keys):
+            # In their new order, each moved row goes right after the row that
+            # now precedes it, which is already in its place by then.
+            moved_ids = {new_rows[i].id for i in np.flatnonzero(np.isin(new_keys, moved_keys)).tolist()}
+            staying = [t for t, is_shown in zip(new_rows, shown.tolist()) if is_shown]
+            ids = [t.id for t in rows[start:start + len(staying)]]
+            for i, transaction in enumerate(staying):
+                if transaction.id not in moved_ids:
+                    continue
+                source = ids.index(transaction.id)
+                destination = ids.index(staying[i - 1].id) + 1 if i else 0
+                if destination == source:
+                    continue
+                self.beginMoveRows(QModelIndex(), start + source, start + source, QModelIndex(), start + destination)
+                if source < destination:
+                    destination -= 1
+                rows.insert(start + destination, rows.pop(start + source))
+                ids.insert(destination, ids.pop(source))
+                self.endMoveRows()
+        for first, last in inserted_runs:
+            self.beginInsertRows(QModelIndex(), start + first, start + last)
+            rows[start + first:start + first] = new_rows[first:last + 1]
+            self.endInsertRows()
+        self._data = new_data
+        for first, last in _row_runs(np.flatnonzero(np.isin(new_keys, updated_keys))):
+            self.dataChanged.emit(self.index(start + first, 0), self.index(start + last, self.columnCount() - 1))
+
     def get_transaction_id(self, row_index):
         if 0 <= row_index < len(self._data):
             return self._data[row_index].id
@@ -120,6 +334,15 @@ class MainWindow(QMainWindow):
 
         self.category_filter_combo = QComboBox()
 
+        self.search_edit = QLineEdit()
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_edit.returnPressed.connect(self.apply_filters)
+
         self.filter_button = QPushButton() 
         self.filter_button.setIcon(self.style().standardIcon(QStyle.SP_DialogApplyButton))
         self.filter_button.clicked.connect(self.apply_filters)
@@ -128,6 +351,7 @@ class MainWindow(QMainWindow):
         self.start_date_label = QLabel() 
         self.end_date_label = QLabel() 
         self.category_filter_label = QLabel() 
+        self.search_label = QLabel()
 
         filter_h_layout.addWidget(self.start_date_label)
         filter_h_layout.addWidget(self.start_date_edit)
@@ -135,6 +359,8 @@ class MainWindow(QMainWindow):
         filter_h_layout.addWidget(self.end_date_edit)
         filter_h_layout.addWidget(self.category_filter_label)
         filter_h_layout.addWidget(self.category_filter_combo)
+        filter_h_layout.addWidget(self.search_label)
+        filter_h_layout.addWidget(self.search_edit)
         filter_h_layout.addStretch(1) 
         filter_h_layout.addWidget(self.filter_button)
         main_v_layout.addWidget(self.filter_groupbox)
@@ -159,9 +385,7 @@ class MainWindow(QMainWindow):
 
         self.table_header_keys = ["date", "description", "type", "amount", "category"]
         self.transaction_model = TransactionTableModel([], self.table_header_keys)
-        self.proxy_model = QSortFilterProxyModel()
-        self.proxy_model.setSourceModel(self.transaction_model)
-        self.table_view.setModel(self.proxy_model)
+        self.table_view.setModel(self.transaction_model)
         self.table_view.sortByColumn(0, Qt.DescendingOrder) 
         self.content_splitter.addWidget(self.table_view)
 
@@ -191,9 +415,15 @@ class MainWindow(QMainWindow):
         self.file_menu = menu_bar.addMenu("") 
         self.add_action_menu = QAction(self.style().standardIcon(QStyle.SP_FileDialogNewFolder), "", self)
         self.add_action_menu.triggered.connect(self.add_transaction)
+        self.import_action = QAction(self.style().standardIcon(QStyle.SP_DialogOpenButton), "", self)
+        self.import_action.triggered.connect(self.import_statements)
+        self.export_action = QAction(self.style().standardIcon(QStyle.SP_DialogSaveButton), "", self)
+        self.export_action.triggered.connect(self.export_transactions)
         self.exit_action = QAction(self.style().standardIcon(QStyle.SP_DialogCloseButton), "", self)
         self.exit_action.triggered.connect(self.close)
         self.file_menu.addAction(self.add_action_menu)
+        self.file_menu.addAction(self.import_action)
+        self.file_menu.addAction(self.export_action)
         self.file_menu.addSeparator()
         self.file_menu.addAction(self.exit_action)
 
@@ -297,6 +527,8 @@ class MainWindow(QMainWindow):
 
         self.file_menu.setTitle(self.translator.translate("menu_file"))
         self.add_action_menu.setText(self.translator.translate("add_transaction"))
+        self.import_action.setText(self.translator.translate("import_statements"))
+        self.export_action.setText(self.translator.translate("export_transactions"))
         self.exit_action.setText(self.translator.translate("menu_exit"))
 
         self.edit_menu.setTitle(self.translator.translate("menu_edit"))
@@ -325,6 +557,8 @@ class MainWindow(QMainWindow):
         self.start_date_label.setText(self.translator.translate("start_date"))
         self.end_date_label.setText(self.translator.translate("end_date"))
         self.category_filter_label.setText(self.translator.translate("category"))
+        self.search_label.setText(self.translator.translate("search_label"))
+        self.search_edit.setPlaceholderText(self.translator.translate("search_placeholder"))
         self.filter_button.setText(self.translator.translate("apply_filter_button"))
 
         self.chart_widget_container.setTitle(self.translator.translate("expense_summary_chart_title"))
@@ -341,8 +575,7 @@ class MainWindow(QMainWindow):
 
 
     def load_transactions(self, filters=None):
-        transactions = self.data_manager.get_transactions(filters)
-        self.transaction_model.refresh_data(transactions)
+        self.transaction_model.set_query(Query.from_filters(filters))
 
     def update_balance_summary(self):
         balance = self.data_manager.get_balance() 
@@ -363,7 +596,53 @@ class MainWindow(QMainWindow):
                 type=data["type"], amount=data["amount"], category=data["category"]
             )
             self.data_manager.add_transaction(transaction)
-            self.apply_filters() 
+            self._show_changes(ChangeSet(added=[transaction.id]))
+
+    def import_statements(self):
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, self.translator.translate("import_statements_title"), "",
+            self.translator.translate("import_file_filter")
+        )
+        if not paths:
+            return
+        try:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                count = self.data_manager.import_statements(paths)
+            finally:
+                # Restored even for errors not caught below, so the busy cursor never sticks.
+                QApplication.restoreOverrideCursor()
+        except (IOError, ValueError, csv.Error, BrokenProcessPool) as e:
+            QMessageBox.warning(self, self.translator.translate("import_statements_title"),
+                                self.translator.translate("import_failed").format(error=e))
+            return
+        self.apply_filters()
+        self.statusBar().showMessage(self.translator.translate("import_done_status").format(count=count))
+
+    def export_transactions(self):
+        # Exports what the table currently shows, i.e. the active filters.
+        file_filter = self.translator.translate("export_file_filter")
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, self.translator.translate("export_transactions_title"), "", file_filter
+        )
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            filters = file_filter.split(";;")
+            extensions = (".csv", ".jsonl", ".swcol")
+            path += extensions[filters.index(selected_filter)] if selected_filter in filters else extensions[0]
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            result = self.data_manager.export_transactions(path, filters=getattr(self, "current_filters", None))
+        except (IOError, ValueError) as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, self.translator.translate("export_transactions_title"),
+                                self.translator.translate("export_failed").format(error=e))
+            return
+        QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(self.translator.translate("export_done_status").format(
+            count=result.rows, seconds=result.seconds, rate=result.rows_per_second
+        ))
 
     def edit_transaction(self):
         selected_indexes = self.table_view.selectionModel().selectedRows()
@@ -372,8 +651,7 @@ class MainWindow(QMainWindow):
                                 self.translator.translate("select_transaction_to_edit"))
             return
 
-        source_index = self.proxy_model.mapToSource(selected_indexes[0])
-        transaction_id = self.transaction_model.get_transaction_id(source_index.row())
+        transaction_id = self.transaction_model.get_transaction_id(selected_indexes[0].row())
 
         if transaction_id:
             transaction = self.data_manager.get_transaction_by_id(transaction_id)
@@ -386,7 +664,7 @@ class MainWindow(QMainWindow):
                         type=updated_data["type"], amount=updated_data["amount"], category=updated_data["category"]
                     )
                     self.data_manager.edit_transaction(transaction.id, updated_transaction)
-                    self.apply_filters()
+                    self._show_changes(ChangeSet(updated=[transaction.id]))
 
     def delete_transaction(self):
         selected_indexes = self.table_view.selectionModel().selectedRows()
@@ -400,25 +678,42 @@ class MainWindow(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            source_index = self.proxy_model.mapToSource(selected_indexes[0])
-            transaction_id = self.transaction_model.get_transaction_id(source_index.row())
+            transaction_id = self.transaction_model.get_transaction_id(selected_indexes[0].row())
             if transaction_id:
                 self.data_manager.delete_transaction(transaction_id)
-                self.apply_filters()
+                self._show_changes(ChangeSet(removed=[transaction_id]))
 
     def apply_filters(self):
         start_date = self.start_date_edit.date()
         end_date = self.end_date_edit.date()
         category_key = self.category_filter_combo.currentData()
+        self.search_timer.stop()
 
         self.current_filters = { 
             "start_date": start_date, "end_date": end_date,
-            "category": category_key if category_key != "all" else None
+            "category": category_key if category_key != "all" else None,
+            "text": self.search_edit.text().strip() or None
         }
         self.load_transactions(self.current_filters) 
         self.update_balance_summary() 
         self.spend_chart.update_chart(self.current_filters) 
 
+    def _show_changes(self, changes):
+        # Re-runs the current filters and applies just the difference to the
+        # table, so it keeps its scroll position and selection, and updates
+        # the balance and chart in place.
+        if changes.reset or not hasattr(self, 'current_filters'):
+            self.apply_filters()
+            return
+        self.transaction_model.reload(changes.updated)
+        self.update_balance_summary()
+        self.spend_chart.refresh_totals()
+
+    def on_external_changes(self, changes):
+        # Someone else changed the data files.
+        self._show_changes(changes)
+        self.statusBar().showMessage(self.translator.translate("external_changes_status").format(count=len(changes)))
+
     def change_language(self, lang_code):
         self.settings.setValue("language", lang_code)
         self.translator.set_language(lang_code) 
@@ -509,6 +804,9 @@ class MainWindow(QMainWindow):
         stats_dialog.exec_()
 
     def closeEvent(self, event):
+        if not self.data_manager.close():
+            QMessageBox.warning(self, self.translator.translate("save_failed_title"),
+                                self.translator.translate("save_failed_on_close"))
         super().closeEvent(event)
 
     def resizeEvent(self, event):
@@ -3,7 +3,6 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QApplication, QSizePol
 from PyQt5.QtChart import QChart, QChartView, QPieSeries, QPieSlice, QLegend
 from PyQt5.QtGui import QPainter, QColor, QFont, QBrush, QPen
 from PyQt5.QtCore import Qt
-from collections import defaultdict
 
 class SpendChartWidget(QWidget):
     def __init__(self, data_manager, translator, parent=None):
@@ -11,6 +10,8 @@ class SpendChartWidget(QWidget):
         self.data_manager = data_manager
         self.translator = translator
         self.current_filters = None
+        # Slices of the current series by category key.
+        self._slices = {}
 
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setMinimumHeight(200) 
@@ -30,21 +31,27 @@ class SpendChartWidget(QWidget):
         layout.addWidget(self.chart_view)
         self.update_chart_theme() 
 
+    def _slice_label(self, category_key, total_amount, total_filtered_expenses):
+        percentage = (total_amount / total_filtered_expenses) * 100 if total_filtered_expenses > 0 else 0
+
+        amount_str = f"{total_amount:.2f}"
+        translated_category = self.translator.translate(category_key)
+        currency_sym = self.data_manager.get_display_currency_symbol()
+
+        if QApplication.instance().layoutDirection() == Qt.RightToLeft:
+            return f"{translated_category}: {amount_str} {currency_sym} ({percentage:.1f}%)"
+        return f"{translated_category}: {currency_sym}{amount_str} ({percentage:.1f}%)"
+
     def update_chart(self, filters=None):
         self.current_filters = filters
         self.chart.removeAllSeries() 
+        self._slices = {}
         self.chart.setTitle("") 
 
         self.chart.setTitle(self.translator.translate("expense_summary_chart_title", "Expense Summary"))
 
-        transactions_to_chart = self.data_manager.get_transactions(self.current_filters)
-
-        expenses_by_category = defaultdict(float)
-        total_filtered_expenses = 0.0
-        for t in transactions_to_chart:
-            if t.type == "expense":
-                expenses_by_category[t.category] += t.amount
-                total_filtered_expenses += t.amount
+        expenses_by_category = self.data_manager.get_expenses_by_category(filters=self.current_filters)
+        total_filtered_expenses = sum(expenses_by_category.values())
 
         if not expenses_by_category:
             self.chart.setTitle(self.translator.translate("no_data_for_chart", "No expense data to display for current filters."))
@@ -69,21 +76,13 @@ class SpendChartWidget(QWidget):
         for category_key, total_amount in sorted_categories:
             if total_amount <= 0: continue 
 
-            percentage = (total_amount / total_filtered_expenses) * 100 if total_filtered_expenses > 0 else 0
-
-            amount_str = f"{total_amount:.2f}"
-            translated_category = self.translator.translate(category_key)
-            currency_sym = self.data_manager.get_display_currency_symbol()
-
-            if QApplication.instance().layoutDirection() == Qt.RightToLeft:
-                 slice_label_text = f"{translated_category}: {amount_str} {currency_sym} ({percentage:.1f}%)"
-            else:
-                 slice_label_text = f"{translated_category}: {currency_sym}{amount_str} ({percentage:.1f}%)"
+            slice_label_text = self._slice_label(category_key, total_amount, total_filtered_expenses)
 
             pie_slice = QPieSlice(slice_label_text, total_amount)
             pie_slice.setLabelVisible(True) 
             pie_slice.setColor(palette[slice_count % len(palette)])
             series.append(pie_slice)
+            self._slices[category_key] = pie_slice
             slice_count += 1
 
         self.chart.addSeries(series)
@@ -100,6 +99,40 @@ class SpendChartWidget(QWidget):
 
         self.update_chart_theme() 
 
+    def refresh_totals(self):
+        # Re-reads the totals for the current filters and updates the slices
+        # in place, adding or dropping slices for categories that appeared or
+        # emptied, so the chart animates to the new values instead of being
+        # rebuilt. Falls back to update_chart() when no slice survives.
+        expenses_by_category = {
+            category_key: amount
+            for category_key, amount in self.data_manager.get_expenses_by_category(filters=self.current_filters).items()
+            if amount > 0
+        }
+        series = self.chart.series()
+        if not series or not set(self._slices) & set(expenses_by_category):
+            self.update_chart(self.current_filters)
+            return
+        series = series[0]
+        total_filtered_expenses = sum(expenses_by_category.values())
+
+        for category_key in [key for key in self._slices if key not in expenses_by_category]:
+            series.remove(self._slices.pop(category_key))
+        template = next(iter(self._slices.values()))
+        for category_key, total_amount in expenses_by_category.items():
+            slice_label_text = self._slice_label(category_key, total_amount, total_filtered_expenses)
+            pie_slice = self._slices.get(category_key)
+            if pie_slice is None:
+                pie_slice = QPieSlice(slice_label_text, total_amount)
+                pie_slice.setLabelVisible(True)
+                pie_slice.setLabelBrush(template.labelBrush())
+                pie_slice.setLabelFont(template.labelFont())
+                series.append(pie_slice)
+                self._slices[category_key] = pie_slice
+            else:
+                pie_slice.setValue(total_amount)
+                pie_slice.setLabel(slice_label_text)
+
     def update_chart_theme(self):
         theme_manager = QApplication.instance().theme_manager
         is_dark_theme = theme_manager.current_theme == "dark"
@@ -39,6 +39,22 @@ class SplashScreen(QSplashScreen):
 
         QTimer.singleShot(50, self.opacity_animation.start) 
 
+        self.cancel_requested = False
+
+    def show_progress(self, done, total, message):
+        # Used as DataManager's load progress callback; Escape cancels the load.
+        text = message
+        if total > 0:
+            text = f"{message} {min(100, int(done * 100 / total))}%"
+        self.showMessage(text, Qt.AlignTop | Qt.AlignHCenter, Qt.lightGray)
+        QApplication.processEvents()
+        return not self.cancel_requested
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.cancel_requested = True
+        super().keyPressEvent(event)
+
     def finish(self, main_window_instance):
         if self.opacity_animation.state() == QPropertyAnimation.Running and            self.opacity_animation.direction() == QPropertyAnimation.Forward:
             try: self.opacity_animation.finished.disconnect() 
@@ -47,8 +47,7 @@ class StatisticsDialog(QDialog):
     def _load_statistics(self):
         self.stats_table.setRowCount(0) 
 
-        all_transactions = self.data_manager.get_transactions() 
-        expenses_by_category = self.data_manager.get_expenses_by_category(all_transactions)
+        expenses_by_category = self.data_manager.get_expenses_by_category()
 
         currency_symbol = self.data_manager.get_display_currency_symbol()
 
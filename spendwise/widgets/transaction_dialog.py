@@ -2,9 +2,9 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QFormLayout, QLineEdit, QComboBox,
     QDoubleSpinBox, QDateEdit, QDialogButtonBox, QLabel, QApplication, QMessageBox,
-    QPushButton, QStyle
+    QPushButton, QStyle, QCompleter
 )
-from PyQt5.QtCore import QDate, Qt, QTimer
+from PyQt5.QtCore import QDate, Qt, QTimer, QStringListModel
 from PyQt5.QtGui import QIcon, QPalette, QColor
 
 class TransactionDialog(QDialog):
@@ -47,6 +47,15 @@ class TransactionDialog(QDialog):
 
         self.description_label = QLabel()
         self.description_edit = QLineEdit()
+        # Past descriptions as you type; the list is already narrowed and
+        # ranked by DataManager, so the completer shows it as is.
+        self.suggestion_model = QStringListModel(self)
+        self.description_completer = QCompleter(self.suggestion_model, self)
+        self.description_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.description_completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.description_completer.activated[str].connect(self._on_suggestion_picked)
+        self.description_edit.setCompleter(self.description_completer)
+        self.description_edit.textEdited.connect(self._on_description_edited)
         form_layout.addRow(self.description_label, self.description_edit)
 
         self.type_label = QLabel()
@@ -122,6 +131,23 @@ class TransactionDialog(QDialog):
         elif self.category_combo.count() > 0: self.category_combo.setCurrentIndex(0)
 
 
+    def _on_description_edited(self, text):
+        # Runs before QLineEdit asks the completer to update its popup.
+        self.suggestion_model.setStringList(self.data_manager.suggest_descriptions(text.strip()))
+
+    def _on_suggestion_picked(self, description):
+        guess = self.data_manager.guess_transaction_details(description)
+        if guess is None:
+            return
+        type_key, category_key, amount = guess
+        type_index = self.type_combo.findData(type_key)
+        if type_index != -1:
+            self.type_combo.setCurrentIndex(type_index)
+        category_index = self.category_combo.findData(category_key)
+        if category_index != -1:
+            self.category_combo.setCurrentIndex(category_index)
+        self.amount_spinbox.setValue(amount)
+
     def _populate_fields(self):
         if self.transaction_to_edit:
             self.date_edit.setDate(self.transaction_to_edit.date)